@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import re
 
 from logging.config import fileConfig
 from typing import Optional
@@ -25,7 +26,15 @@
 # get alembic migrations logger
 log = logging.getLogger("alembic.runtime.migration")
 
-# do not drop tables if unknown to alembic
+# search columns and indexes live in migrations only and are unknown to
+# models: tsvector columns, trigram and full-text indexes
+SEARCH_OBJECTS = {
+    "column": re.compile(r"\w+_tsv"),
+    "index": re.compile(r"ix_\w+_(trgm|tsv)"),
+}
+
+
+# do not drop tables if unknown to alembic, nor search columns and indexes
 def include_object(
     obj: Table | Column,
     name: str,
@@ -33,7 +42,15 @@ def include_object(
     reflected: bool,
     compare_to: Optional[Table | Column],
 ):
-    if type_ == "table" and reflected and compare_to is None:
+    if (
+        reflected
+        and compare_to is None
+        and (
+            type_ == "table"
+            or type_ in SEARCH_OBJECTS
+            and SEARCH_OBJECTS[type_].fullmatch(name)
+        )
+    ):
         log.info(
             "Exclude: %s [%s, %s] %s | %s.",
             obj,
@@ -0,0 +1,75 @@
+"""Add trigram indexes and full-text search columns
+
+Revision ID: 1158a70de6c5
+Revises: 36de6327839e
+Create Date: 2026-10-18 19:05:12.418231
+
+"""
+import sqlalchemy as sa
+
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1158a70de6c5"
+down_revision = "36de6327839e"
+branch_labels = None
+depends_on = None
+
+# columns searched with similarity and ilike operators
+TRIGRAM_COLUMNS = {
+    "books": ["title", "description"],
+    "authors": ["first_name", "last_name", "middle_name"],
+    "publishers": ["name"],
+}
+
+# columns searched with full-text operator
+FULL_TEXT_COLUMNS = {
+    "books": ["title", "description"],
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.create_index(
+                f"ix_{table}_{column}_trgm",
+                table,
+                [column],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+    for table, columns in FULL_TEXT_COLUMNS.items():
+        for column in columns:
+            op.add_column(
+                table,
+                sa.Column(
+                    f"{column}_tsv",
+                    postgresql.TSVECTOR(),
+                    sa.Computed(
+                        f"to_tsvector('simple', coalesce({column}, ''))",
+                        persisted=True,
+                    ),
+                    nullable=True,
+                ),
+            )
+            op.create_index(
+                f"ix_{table}_{column}_tsv",
+                table,
+                [f"{column}_tsv"],
+                unique=False,
+                postgresql_using="gin",
+            )
+
+
+def downgrade() -> None:
+    for table, columns in FULL_TEXT_COLUMNS.items():
+        for column in columns:
+            op.drop_index(f"ix_{table}_{column}_tsv", table_name=table)
+            op.drop_column(table, f"{column}_tsv")
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.drop_index(f"ix_{table}_{column}_trgm", table_name=table)
@@ -0,0 +1,34 @@
+"""Add row versions to Publisher, Author, Book
+
+Revision ID: 6d694f0326b2
+Revises: 1158a70de6c5
+Create Date: 2026-10-18 19:31:40.207114
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6d694f0326b2"
+down_revision = "1158a70de6c5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("publishers", "authors", "books"):
+        op.add_column(
+            table,
+            sa.Column(
+                "version",
+                sa.Integer(),
+                server_default="1",
+                nullable=False,
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table in ("books", "authors", "publishers"):
+        op.drop_column(table, "version")
@@ -0,0 +1,139 @@
+"""Add book summaries maintained by triggers
+
+Revision ID: 9a4c2e7f3b1d
+Revises: 6d694f0326b2
+Create Date: 2026-10-18 21:12:47.530918
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a4c2e7f3b1d"
+down_revision = "6d694f0326b2"
+branch_labels = None
+depends_on = None
+
+REFRESH = """
+CREATE FUNCTION refresh_book_summaries(book_ids bigint[]) RETURNS void
+LANGUAGE sql AS $$
+INSERT INTO book_summaries (book_id, publisher, authors)
+SELECT
+    books.id,
+    CASE WHEN publishers.id IS NOT NULL
+        THEN json_build_object('id', publishers.id, 'name', publishers.name)
+    END,
+    coalesce(
+        (
+            SELECT json_agg(
+                json_build_object(
+                    'id', authors.id,
+                    'first_name', authors.first_name,
+                    'last_name', authors.last_name,
+                    'middle_name', authors.middle_name
+                )
+                ORDER BY authors.id
+            )
+            FROM author_book_association
+            JOIN authors ON authors.id = author_book_association.author_id
+            WHERE author_book_association.book_id = books.id
+        ),
+        '[]'
+    )
+FROM books LEFT JOIN publishers ON publishers.id = books.publisher_id
+WHERE books.id = ANY(book_ids)
+ON CONFLICT (book_id) DO UPDATE
+SET publisher = excluded.publisher, authors = excluded.authors
+$$
+"""
+
+CHANGED = "FROM new_rows JOIN old_rows USING (id) WHERE "
+
+# statement triggers: event, table, transition tables and refreshed books;
+# version bumps also update rows, so only changes of embedded columns count
+TRIGGERS = {
+    "books_insert": (
+        "INSERT ON books",
+        "NEW TABLE AS new_rows",
+        "SELECT id FROM new_rows",
+    ),
+    "books_update": (
+        "UPDATE ON books",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "SELECT id "
+        + CHANGED
+        + "new_rows.publisher_id IS DISTINCT FROM old_rows.publisher_id",
+    ),
+    "associations_insert": (
+        "INSERT ON author_book_association",
+        "NEW TABLE AS new_rows",
+        "SELECT book_id FROM new_rows",
+    ),
+    "associations_delete": (
+        "DELETE ON author_book_association",
+        "OLD TABLE AS old_rows",
+        "SELECT book_id FROM old_rows",
+    ),
+    "authors_update": (
+        "UPDATE ON authors",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "SELECT book_id FROM author_book_association WHERE author_id IN "
+        "(SELECT id "
+        + CHANGED
+        + "(new_rows.first_name, new_rows.last_name, new_rows.middle_name) "
+        "IS DISTINCT FROM "
+        "(old_rows.first_name, old_rows.last_name, old_rows.middle_name))",
+    ),
+    "publishers_update": (
+        "UPDATE ON publishers",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "SELECT books.id FROM books WHERE publisher_id IN "
+        "(SELECT id "
+        + CHANGED
+        + "new_rows.name IS DISTINCT FROM old_rows.name)",
+    ),
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "book_summaries",
+        sa.Column(
+            "book_id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            nullable=False,
+        ),
+        sa.Column("publisher", sa.JSON(), nullable=True),
+        sa.Column("authors", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["book_id"],
+            ["books.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("book_id"),
+    )
+    op.execute(REFRESH)
+    for name, (when, transitions, books) in TRIGGERS.items():
+        op.execute(
+            f"CREATE FUNCTION book_summaries_{name}() RETURNS trigger "
+            f"LANGUAGE plpgsql AS $$ BEGIN "
+            f"PERFORM refresh_book_summaries(ARRAY({books})); "
+            f"RETURN NULL; END $$"
+        )
+        op.execute(
+            f"CREATE TRIGGER book_summaries_{name} AFTER {when} "
+            f"REFERENCING {transitions} FOR EACH STATEMENT "
+            f"EXECUTE FUNCTION book_summaries_{name}()"
+        )
+    op.execute("SELECT refresh_book_summaries(ARRAY(SELECT id FROM books))")
+
+
+def downgrade() -> None:
+    for name, (when, *_) in TRIGGERS.items():
+        op.execute(
+            f"DROP TRIGGER book_summaries_{name} ON {when.split(' ON ')[1]}"
+        )
+        op.execute(f"DROP FUNCTION book_summaries_{name}()")
+    op.execute("DROP FUNCTION refresh_book_summaries(bigint[])")
+    op.drop_table("book_summaries")
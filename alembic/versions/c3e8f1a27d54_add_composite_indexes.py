@@ -0,0 +1,53 @@
+"""Add composite indexes, drop redundant ones
+
+Revision ID: c3e8f1a27d54
+Revises: 9a4c2e7f3b1d
+Create Date: 2026-10-18 22:04:31.862095
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e8f1a27d54"
+down_revision = "9a4c2e7f3b1d"
+branch_labels = None
+depends_on = None
+
+# indexes proposed by benchmarks.indexes: name, table and columns
+INDEXES = [
+    (
+        "ix_author_book_association_author_id_book_id",
+        "author_book_association",
+        ["author_id", "book_id"],
+    ),
+    ("ix_books_publisher_id_id", "books", ["publisher_id", "id"]),
+    ("ix_books_title_id", "books", ["title", "id"]),
+    ("ix_books_year_id", "books", ["year", "id"]),
+    ("ix_authors_last_name_id", "authors", ["last_name", "id"]),
+    ("ix_publishers_name_id", "publishers", ["name", "id"]),
+]
+
+# indexes that are prefixes of primary keys or of the new ones
+REPLACED = [
+    ("ix_books_id", "books", ["id"]),
+    ("ix_authors_id", "authors", ["id"]),
+    ("ix_publishers_id", "publishers", ["id"]),
+    ("ix_books_title", "books", ["title"]),
+    ("ix_books_year", "books", ["year"]),
+    ("ix_authors_last_name", "authors", ["last_name"]),
+    ("ix_publishers_name", "publishers", ["name"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+    for name, table, _ in REPLACED:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table, columns in REPLACED:
+        op.create_index(name, table, columns, unique=False)
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
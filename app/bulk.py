@@ -0,0 +1,297 @@
+import json
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Type
+
+# http status and request
+from fastapi import Request, status
+
+# exceptions
+from fastapi.exceptions import HTTPException
+
+# pydantic exception and model
+from pydantic import BaseModel, ValidationError
+
+# get sqlalchemy functions
+from sqlalchemy import (
+    bindparam,
+    func,
+    insert,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import SQLAlchemyError
+
+# get sqlalchemy async session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# response cache
+from .cache import Cache
+
+# database schemas
+from .db import schemas
+
+# app settings
+from .settings import settings
+
+# most bind parameters of a statement (asyncpg)
+MAX_PARAMETERS = 32767
+
+NDJSON_TYPES = (
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/jsonl",
+)
+
+# validated rows with their indexes in request body
+Rows = list[tuple[int, BaseModel]]
+
+# written rows (index, id, created) and cache keys to invalidate
+Written = tuple[list[tuple[int, int, bool]], list[str]]
+
+
+# request body documentation of bulk routes
+def bulk_openapi(schema: Type[BaseModel]) -> dict:
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": schema.schema()}
+                },
+                "application/x-ndjson": {"schema": schema.schema()},
+            },
+        }
+    }
+
+
+def error(loc: list, msg: str, type: str) -> dict:
+    return {"loc": loc, "msg": msg, "type": type}
+
+
+def fail(result: schemas.BulkResult, index: int, errors: list[dict]):
+    result.failed += 1
+    result.errors.append(
+        schemas.BulkError(
+            index=index,
+            detail=[
+                {**e, "msg": e["msg"].capitalize().rstrip(".") + "."}
+                for e in errors
+            ],
+        )
+    )
+
+
+# read JSON array or NDJSON stream as batches of raw rows with offsets,
+# NDJSON is never read into memory as a whole
+async def read_batches(request: Request) -> AsyncIterator[tuple[int, list]]:
+    size, offset = settings.bulk_batch_size, 0
+    content_type = request.headers.get("content-type", "").split(";")[0]
+    if content_type.strip() in NDJSON_TYPES:
+        batch, rest = [], b""
+        async for chunk in request.stream():
+            *lines, rest = (rest + chunk).split(b"\n")
+            batch.extend(line for line in lines if line.strip())
+            while len(batch) >= size:
+                yield offset, batch[:size]
+                batch, offset = batch[size:], offset + size
+        if rest.strip():
+            batch.append(rest)
+        if batch:
+            yield offset, batch
+        return
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        rows = None
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[
+                error(
+                    ["body"],
+                    "Expected JSON array or NDJSON stream.",
+                    "value_error.bulk",
+                )
+            ],
+        )
+    for offset in range(0, len(rows), size):
+        yield offset, rows[offset : offset + size]
+
+
+# validate raw rows, failed ones are reported in result
+def validate_rows(
+    schema: Type[BaseModel],
+    rows: list[Any],
+    offset: int,
+    result: schemas.BulkResult,
+) -> Rows:
+    valid, ids = [], set()
+    for index, row in enumerate(rows, offset):
+        result.ids.append(None)
+        try:
+            item = (
+                schema.parse_raw(row)
+                if isinstance(row, bytes)
+                else schema.parse_obj(row)
+            )
+        except ValidationError as e:
+            fail(result, index, e.errors())
+            continue
+        if item.id is not None:
+            if item.id in ids:
+                fail(
+                    result,
+                    index,
+                    [error(["id"], "Duplicate id.", "value_error.duplicate")],
+                )
+                continue
+            ids.add(item.id)
+        valid.append((index, item))
+    return valid
+
+
+# get ids existing in database for several tables in one query
+async def existing_ids(
+    session: AsyncSession,
+    **tables: tuple[Any, set[int]],
+) -> dict[str, set[int]]:
+    found = {name: set() for name in tables}
+    if queries := [
+        select(literal(name).label("name"), model.id).where(model.id.in_(ids))
+        for name, (model, ids) in tables.items()
+        if ids
+    ]:
+        for name, id in await session.execute(
+            union_all(*queries) if len(queries) > 1 else queries[0]
+        ):
+            found[name].add(id)
+    return found
+
+
+# report rows updating missing ids
+async def check_ids(
+    session: AsyncSession,
+    model,
+    table: str,
+    valid: Rows,
+    result: schemas.BulkResult,
+) -> Rows:
+    found = await existing_ids(
+        session, **{table: (model, {item.id for _, item in valid if item.id})}
+    )
+    checked = []
+    for index, item in valid:
+        if item.id and item.id not in found[table]:
+            fail(
+                result,
+                index,
+                [error(["id"], f"No such {table}.", f"not_found.{table}")],
+            )
+        else:
+            checked.append((index, item))
+    return checked
+
+
+# insert rows with multi-row INSERTs of as many rows as bind parameters
+# allow, ids keep rows order: RETURNING does not promise rows order, so ids
+# are drawn from the id sequence first and inserted with their rows
+async def insert_rows(session: AsyncSession, model, rows: list[dict]):
+    if not rows:
+        return []
+    table = model.__table__
+    if session.bind.dialect.name == "postgresql":
+        ids = (
+            await session.scalars(
+                select(
+                    func.nextval(
+                        func.pg_get_serial_sequence(table.fullname, "id")
+                    )
+                ).select_from(func.generate_series(1, len(rows)))
+            )
+        ).all()
+        rows = [row | {"id": id} for row, id in zip(rows, ids)]
+        # columns with python defaults are bound too
+        size = MAX_PARAMETERS // len(table.columns)
+        for start in range(0, len(rows), size):
+            await session.execute(
+                insert(table).values(rows[start : start + size])
+            )
+        return ids
+    # no sequences, e.g. sqlite
+    ids = []
+    for row in rows:
+        inserted = await session.execute(insert(model).values(row))
+        ids.append(inserted.inserted_primary_key[0])
+    return ids
+
+
+# update rows by id in a single executemany
+async def update_rows(session: AsyncSession, model, rows: list[dict]):
+    if not rows:
+        return
+    table = model.__table__
+    await session.execute(
+        update(table).where(table.c.id == bindparam("row_id")),
+        [
+            {"row_id": row["id"]}
+            | {key: value for key, value in row.items() if key != "id"}
+            for row in rows
+        ],
+    )
+
+
+# write checked rows of a batch in one transaction and record them in
+# result, a failed statement fails every row of the batch
+async def write_batch(
+    session: AsyncSession,
+    cache: Cache,
+    valid: Rows,
+    write: Callable[[AsyncSession, Rows], Awaitable[Written]],
+    result: schemas.BulkResult,
+):
+    try:
+        written, keys = await write(session, valid)
+        await session.commit()
+    except SQLAlchemyError as e:
+        await session.rollback()
+        for index, _ in valid:
+            fail(
+                result,
+                index,
+                [
+                    error(
+                        [],
+                        f"Batch failed: {e.__class__.__name__}.",
+                        "bulk.batch_failed",
+                    )
+                ],
+            )
+        return
+    await cache.invalidate(*keys)
+    for index, id, created in written:
+        result.ids[index] = id
+        if created:
+            result.created += 1
+        else:
+            result.updated += 1
+
+
+# create rows without id and update rows with id in batched transactions,
+# a failed row never aborts other rows, a failed statement only its batch
+async def bulk_write(
+    request: Request,
+    session: AsyncSession,
+    cache: Cache,
+    schema: Type[BaseModel],
+    check: Callable[[AsyncSession, Rows, schemas.BulkResult], Awaitable[Rows]],
+    write: Callable[[AsyncSession, Rows], Awaitable[Written]],
+) -> schemas.BulkResult:
+    result = schemas.BulkResult()
+    async for offset, rows in read_batches(request):
+        if valid := await check(
+            session, validate_rows(schema, rows, offset, result), result
+        ):
+            await write_batch(session, cache, valid, write, result)
+    return result
@@ -0,0 +1,195 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Iterable, Optional
+
+# json response
+from fastapi.responses import Response
+
+# pydantic model
+from pydantic import BaseModel
+
+# app settings
+from .settings import settings
+
+
+# cache key of a single entity, tags its own cached responses
+def cache_key(table: str, id: Any) -> str:
+    return f"{table}:{id}"
+
+
+# tag of cached responses embedding an entity, apart from entity keys so
+# that a write changing relations of an entity does not evict responses
+# which only embed its fields
+def embed_tag(table: str, id: Any) -> str:
+    return f"tag:{table}:{id}"
+
+
+# keys invalidated when fields of entities change: their own responses and
+# responses embedding them
+def changed_keys(table: str, ids: Iterable[Any]) -> list[str]:
+    return [
+        key
+        for id in ids
+        for key in (cache_key(table, id), embed_tag(table, id))
+    ]
+
+
+# cache of serialized responses: every entry is tagged by its entity key and
+# by embed tags of entities it embeds, invalidating a key or tag evicts
+# entries tagged by it
+class Cache(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, tags: Iterable[str] = ()):
+        pass
+
+    @abstractmethod
+    async def invalidate(self, *keys: str):
+        pass
+
+    async def fetch(self, key: str) -> Optional[Response]:
+        if (value := await self.get(key)) is None:
+            return None
+        return Response(value, media_type="application/json")
+
+    async def store(
+        self,
+        key: str,
+        model: BaseModel,
+        tags: Iterable[str] = (),
+    ) -> Response:
+        await self.set(key, value := model.json().encode(), tags)
+        return Response(value, media_type="application/json")
+
+
+class NullCache(Cache):
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str] = ()):
+        pass
+
+    async def invalidate(self, *keys: str):
+        pass
+
+
+# in-process LRU cache with TTL
+class MemoryCache(Cache):
+    def __init__(self, size: int, ttl: float):
+        self.size, self.ttl = size, ttl
+        self.entries: OrderedDict[
+            str, tuple[float, bytes, set[str]]
+        ] = OrderedDict()
+        self.tags: dict[str, set[str]] = {}
+
+    def _evict(self, key: str):
+        if entry := self.entries.pop(key, None):
+            for tag in entry[2]:
+                if (keys := self.tags.get(tag)) is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.tags[tag]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not (entry := self.entries.get(key)):
+            return None
+        if entry[0] < monotonic():
+            self._evict(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str] = ()):
+        self._evict(key)
+        tags = set(tags)
+        self.entries[key] = (monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        while len(self.entries) > self.size:
+            self._evict(next(iter(self.entries)))
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            for tagged in list(self.tags.get(key, ())):
+                self._evict(tagged)
+            self._evict(key)
+
+
+# redis cache, tags are sets of entry keys; works with any client having
+# get, set, delete, sadd, smembers and expire coroutines (redis.asyncio)
+class RedisCache(Cache):
+    def __init__(self, client, ttl: int, prefix: str = "library:"):
+        self.client, self.ttl, self.prefix = client, ttl, prefix
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str] = ()):
+        await self.client.set(self.prefix + key, value, ex=self.ttl)
+        for tag in tags:
+            await self.client.sadd(self._tag(tag), self.prefix + key)
+            await self.client.expire(self._tag(tag), self.ttl)
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            await self.client.delete(
+                self.prefix + key,
+                self._tag(key),
+                *await self.client.smembers(self._tag(key)),
+            )
+
+
+# in-memory stand-in for redis client in tests, entries never expire
+class MemoryRedis:
+    def __init__(self):
+        self.data: dict[str, Any] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        self.data[key] = value
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def sadd(self, key: str, *values: str):
+        self.data.setdefault(key, set()).update(values)
+
+    async def smembers(self, key: str) -> Iterable[str]:
+        return set(self.data.get(key, ()))
+
+    async def expire(self, key: str, seconds: int):
+        pass
+
+
+# client of redis backends, None for other backends
+def redis_client():
+    match settings.cache_backend:
+        case "redis":
+            # optional dependency
+            from redis.asyncio import from_url
+
+            return from_url(settings.cache_redis_url)
+        case "redis-memory":
+            return MemoryRedis()
+    return None
+
+
+def create_cache() -> Cache:
+    if (client := redis_client()) is not None:
+        return RedisCache(client, settings.cache_ttl)
+    if settings.cache_backend == "memory":
+        return MemoryCache(settings.cache_size, settings.cache_ttl)
+    return NullCache()
+
+
+CACHE = create_cache()
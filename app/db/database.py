@@ -1,3 +1,7 @@
+import asyncio
+
+from typing import Optional
+
 # uuid generation
 from uuid import uuid4
 
@@ -6,12 +10,22 @@
 
 # sqlalchemy engine
 from sqlalchemy.engine import URL
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
 
+# sqlalchemy pool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
 # app settings
 from ..settings import settings
 
+# instrumented pool
+from .pool import InstrumentedPool
+
 
 class CustomConnection(Connection):
     def _get_unique_id(self, prefix: str) -> str:
@@ -27,22 +41,86 @@ def _get_unique_id(self, prefix: str) -> str:
     database=settings.db_db,
 )
 
-ASYNC_ENGINE = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,
-    connect_args={
+
+# asyncpg statement caching of connection mode:
+#   direct - named prepared statements are cached per connection
+#   pgbouncer - cached too, for proxies supporting protocol-level prepared
+#     statements (pgbouncer >= 1.21), names are unique across clients
+#   disabled - every query is parsed and planned again, for proxies without
+#     prepared statements support
+def connect_args(mode: str) -> dict:
+    if DATABASE_URL.get_driver_name() != "asyncpg":
+        return {}
+    size = settings.db_statement_cache_size
+    match mode:
+        case "direct":
+            return {
+                "statement_cache_size": size,
+                "prepared_statement_cache_size": size,
+            }
+        case "pgbouncer":
+            return {
+                "statement_cache_size": size,
+                "prepared_statement_cache_size": size,
+                "connection_class": CustomConnection,
+            }
+    return {
         "statement_cache_size": 0,
         "prepared_statement_cache_size": 0,
         "connection_class": CustomConnection,
-    },
-)
+    }
 
-ASYNC_SESSION = sessionmaker(
-    bind=ASYNC_ENGINE,
-    class_=AsyncSession,
-    future=True,
-    autoflush=False,
-    autocommit=False,
-    expire_on_commit=False,
-)
+
+# engine with pool settings, pool metrics are only collected for primary
+def create_engine(url: URL, poolclass=AsyncAdaptedQueuePool) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.db_echo,
+        poolclass=poolclass,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args(settings.db_statement_mode),
+    )
+
+
+def create_sessionmaker(engine: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        future=True,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+    )
+
+
+# primary engine of this process, created on app startup so that every
+# worker process opens its own pool instead of inheriting one
+class Database:
+    def __init__(self):
+        self.engine: Optional[AsyncEngine] = None
+        self.session: Optional[sessionmaker] = None
+
+    def connect(self):
+        if self.engine is None:
+            self.engine = create_engine(DATABASE_URL, InstrumentedPool)
+            self.session = create_sessionmaker(self.engine)
+
+    # open pool connections at once, before traffic is accepted
+    async def warm(self, connections: int):
+        opened = await asyncio.gather(
+            *(self.engine.connect() for _ in range(connections))
+        )
+        for connection in opened:
+            await connection.close()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = self.session = None
+
+
+DATABASE = Database()
@@ -1,3 +1,5 @@
+from functools import reduce
+from operator import add
 from typing import Optional
 
 # get filter class
@@ -6,8 +8,14 @@
 # get validator for restrictions
 from pydantic import validator
 
-# get models
-from . import models
+# get models and search backend
+from . import models, search
+
+# search operators: predicate and rank
+SEARCH_OPERATORS = {
+    "search": (search.search, search.search_rank),
+    "similar": (search.similar, search.similar_rank),
+}
 
 
 def check_fields(banned_fields: list[str], fields: list[str]):
@@ -17,10 +25,64 @@ def check_fields(banned_fields: list[str], fields: list[str]):
     return fields
 
 
-class AuthorFilter(Filter):
+def is_search_field(field_name: str) -> bool:
+    return field_name.rpartition("__")[2] in SEARCH_OPERATORS
+
+
+# filter with full-text and similarity search operators,
+# results are ranked by relevance unless sorted explicitly
+class SearchFilter(Filter):
+    @property
+    def filtering_fields(self):
+        return [
+            (field_name, value)
+            for field_name, value in super().filtering_fields
+            if not is_search_field(field_name)
+        ]
+
+    @property
+    def search_fields(self):
+        return [
+            (*field_name.split("__"), value)
+            for field_name, value in super().filtering_fields
+            if is_search_field(field_name)
+        ]
+
+    def filter(self, query):
+        query = super().filter(query)
+        for field_name, operator, value in self.search_fields:
+            query = query.where(
+                SEARCH_OPERATORS[operator][0](
+                    self.Constants.model, field_name, value
+                )
+            )
+        return query
+
+    def ranking(self):
+        if not (
+            ranks := [
+                SEARCH_OPERATORS[operator][1](
+                    self.Constants.model, field_name, value
+                )
+                for field_name, operator, value in self.search_fields
+            ]
+        ):
+            return []
+        return [reduce(add, ranks).desc(), self.Constants.model.id.asc()]
+
+    def sort(self, query):
+        if self.ordering_values:
+            return super().sort(query)
+        return query.order_by(*self.ranking())
+
+
+class AuthorFilter(SearchFilter):
     first_name__ilike: Optional[str]
+    first_name__similar: Optional[str]
     last_name__ilike: Optional[str]
+    last_name__similar: Optional[str]
     middle_name__ilike: Optional[str]
+    middle_name__similar: Optional[str]
 
     order_by: Optional[list[str]]
 
@@ -32,8 +94,10 @@ def restrict_sortable_fields(cls, value):
         return check_fields(["books"], value) if value else None
 
 
-class BookFilter(Filter):
+class BookFilter(SearchFilter):
     title__ilike: Optional[str]
+    title__search: Optional[str]
+    title__similar: Optional[str]
     year: Optional[int]
     year__lt: Optional[int]
     year__gte: Optional[int]
@@ -44,6 +108,8 @@ class BookFilter(Filter):
     edition__lt: Optional[int]
     edition__gte: Optional[int]
     description__ilike: Optional[str]
+    description__search: Optional[str]
+    description__similar: Optional[str]
 
     order_by: Optional[list[str]]
 
@@ -55,8 +121,9 @@ def restrict_sortable_fields(cls, value):
         return check_fields(["authors"], value) if value else None
 
 
-class PublisherFilter(Filter):
+class PublisherFilter(SearchFilter):
     name__ilike: Optional[str]
+    name__similar: Optional[str]
 
     order_by: Optional[list[str]]
 
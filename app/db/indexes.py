@@ -0,0 +1,176 @@
+# index proposals derived from foreign keys and list filters: a (foreign
+# key, primary key) index for every foreign key and a (key, id) index for
+# every common ordering of list filters, as keyset pages order by their keys
+# with id as tiebreaker; proposals are checked by explaining their queries
+from typing import NamedTuple, Optional
+
+# get sqlalchemy functions and types
+from sqlalchemy import Table, select
+from sqlalchemy.sql import Select
+
+# keyset ordering of list pages
+from ..pagination import order_by_keys, ordering_keys
+
+# plan statements
+from ..queries import EXPLAIN
+
+# database
+from .database import DATABASE
+
+# list filters
+from .filters import AuthorFilter, BookFilter, PublisherFilter
+
+# get models Base
+from .models import Base
+
+SIZE = 50
+
+# orderings clients ask for, as in order_by query parameter
+ORDERINGS = {
+    BookFilter: [["-year"], ["title"]],
+    AuthorFilter: [["last_name"]],
+    PublisherFilter: [["name"]],
+}
+
+# range filters tried with their ordering key
+RANGE_FILTERS = {"year__gte": 1990}
+
+# planner methods disabled on postgresql while explaining
+DISABLED = ("enable_seqscan", "enable_bitmapscan", "enable_sort")
+
+# plan lines of sorts, postgresql and sqlite
+SORTS = ("Sort ", "USE TEMP B-TREE FOR ORDER BY")
+
+
+class Proposal(NamedTuple):
+    table: str
+    columns: tuple[str, ...]
+    reason: str
+    query: Select
+
+
+def existing_indexes(table: Table) -> dict[str, tuple[str, ...]]:
+    indexes = {
+        index.name: tuple(column.name for column in index.columns)
+        for index in table.indexes
+    }
+    indexes["primary key"] = tuple(c.name for c in table.primary_key)
+    return indexes
+
+
+# index whose leading columns are the proposed ones
+def covering_index(proposal: Proposal) -> Optional[str]:
+    columns = proposal.columns
+    for name, indexed in existing_indexes(
+        Base.metadata.tables[proposal.table]
+    ).items():
+        if indexed[: len(columns)] == columns:
+            return name
+    return None
+
+
+# rows of referencing tables are looked up by foreign key, ordered by key
+def foreign_key_proposals() -> list[Proposal]:
+    proposals = []
+    for table in Base.metadata.sorted_tables:
+        for key in table.foreign_keys:
+            rest = tuple(
+                column.name
+                for column in table.primary_key
+                if column is not key.parent
+            )
+            if key.parent.primary_key and not rest:
+                continue
+            proposals.append(
+                Proposal(
+                    table.name,
+                    (key.parent.name, *rest),
+                    f"foreign key to {key.column.table.name}",
+                    select(table)
+                    .where(key.parent == 1)
+                    .order_by(*(table.c[name] for name in rest))
+                    .limit(SIZE),
+                )
+            )
+    return proposals
+
+
+# range filters of ordering key the filter has
+def range_filters(filter_class, key: str) -> dict:
+    return {
+        name: value
+        for name, value in RANGE_FILTERS.items()
+        if name.startswith(f"{key}__") and name in filter_class.__fields__
+    }
+
+
+# keyset page of each common ordering
+def ordering_proposals() -> list[Proposal]:
+    proposals = []
+    for filter_class, orderings in ORDERINGS.items():
+        model = filter_class.Constants.model
+        for order_by in orderings:
+            key = order_by[0].lstrip("+-")
+            _filter = filter_class(
+                order_by=order_by, **range_filters(filter_class, key)
+            )
+            keys = ordering_keys(_filter)
+            proposals.append(
+                Proposal(
+                    model.__tablename__,
+                    tuple(name for name, *_ in keys),
+                    f"order by {','.join(order_by)}",
+                    order_by_keys(_filter.filter(select(model)), keys).limit(
+                        SIZE
+                    ),
+                )
+            )
+    return proposals
+
+
+# indexes made redundant by primary key or by a longer index
+def redundant_indexes() -> list[tuple[str, str]]:
+    redundant = []
+    for table in Base.metadata.sorted_tables:
+        indexes = existing_indexes(table)
+        for name, columns in indexes.items():
+            if name == "primary key":
+                continue
+            for other, other_columns in indexes.items():
+                if other != name and other_columns[: len(columns)] == columns:
+                    redundant.append((name, other))
+                    break
+    return redundant
+
+
+async def explain(query: Select) -> str:
+    async with DATABASE.engine.begin() as connection:
+        dialect = connection.dialect
+        if dialect.name == "postgresql":
+            for setting in DISABLED:
+                await connection.exec_driver_sql(f"SET LOCAL {setting} = off")
+        statement = str(
+            query.compile(
+                dialect=dialect, compile_kwargs={"literal_binds": True}
+            )
+        )
+        rows = await connection.exec_driver_sql(
+            EXPLAIN[dialect.name] + statement
+        )
+        return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+# failure of proposal plan, None when its index is used without sorting
+def check_plan(plan: str, index: Optional[str]) -> Optional[str]:
+    if index is None:
+        return "no index"
+    if any(sort in plan for sort in SORTS):
+        return "sorts rows"
+    if index == "primary key" or index in plan:
+        return None
+    return "index not used"
+
+
+# proposals of foreign keys, then of orderings
+def proposals() -> list[Proposal]:
+    return foreign_key_proposals() + ordering_proposals()
@@ -1,5 +1,15 @@
-# get column types
-from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String
+# get column types and ddl constructs
+from sqlalchemy import (
+    DDL,
+    JSON,
+    BigInteger,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+)
 
 # get base class
 from sqlalchemy.ext.declarative import declarative_base
@@ -17,6 +27,15 @@
 class AuthorBookAssociation(Base):
     __tablename__ = "author_book_association"
 
+    # books of an author, primary key serves authors of a book
+    __table_args__ = (
+        Index(
+            "ix_author_book_association_author_id_book_id",
+            "author_id",
+            "book_id",
+        ),
+    )
+
     # M-M relationship between Book and Author
     book_id = Column(ForeignKey("books.id"), primary_key=True)
     author_id = Column(ForeignKey("authors.id"), primary_key=True)
@@ -25,12 +44,17 @@ class AuthorBookAssociation(Base):
 class Publisher(Base):
     __tablename__ = "publishers"
 
+    # sorted and filtered lists with id tiebreaker, see benchmarks.indexes
+    __table_args__ = (Index("ix_publishers_name_id", "name", "id"),)
+
     id = Column(
         BigInteger().with_variant(Integer, "sqlite"),
         primary_key=True,
-        index=True,
     )
-    name = Column(String, index=True, nullable=False)
+    name = Column(String, nullable=False)
+
+    # bumped whenever response of the row changes
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # 1-M relationship with Book
     books = relationship(
@@ -44,15 +68,20 @@ class Publisher(Base):
 class Author(Base):
     __tablename__ = "authors"
 
+    # sorted and filtered lists with id tiebreaker, see benchmarks.indexes
+    __table_args__ = (Index("ix_authors_last_name_id", "last_name", "id"),)
+
     id = Column(
         BigInteger().with_variant(Integer, "sqlite"),
         primary_key=True,
-        index=True,
     )
     first_name = Column(String, nullable=False)
-    last_name = Column(String, index=True, nullable=False)
+    last_name = Column(String, nullable=False)
     middle_name = Column(String)
 
+    # bumped whenever response of the row changes
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     # M-M relationship with Book
     books = relationship(
         "Book",
@@ -65,17 +94,26 @@ class Author(Base):
 class Book(Base):
     __tablename__ = "books"
 
+    # sorted and filtered lists with id tiebreaker, see benchmarks.indexes
+    __table_args__ = (
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_year_id", "year", "id"),
+        Index("ix_books_publisher_id_id", "publisher_id", "id"),
+    )
+
     id = Column(
         BigInteger().with_variant(Integer, "sqlite"),
         primary_key=True,
-        index=True,
     )
-    title = Column(String, index=True, nullable=False)
-    year = Column(Integer, index=True, nullable=False)
+    title = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
     pages = Column(Integer)
     edition = Column(Integer)
     description = Column(String)
 
+    # bumped whenever response of the row changes
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     # M-M relationship with Author
     authors = relationship(
         "Author",
@@ -93,3 +131,140 @@ class Book(Base):
         foreign_keys=[publisher_id],
         lazy="raise",
     )
+
+    # 1-1 read model of relations
+    summary = relationship(
+        "BookSummary",
+        uselist=False,
+        viewonly=True,
+        lazy="raise",
+    )
+
+
+# read model of book relations: authors and publisher of a book as JSON,
+# kept up to date by triggers (postgresql ones are created by migrations)
+class BookSummary(Base):
+    __tablename__ = "book_summaries"
+
+    book_id = Column(
+        ForeignKey("books.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    publisher = Column(JSON)
+    authors = Column(JSON, nullable=False)
+
+
+# refresh summaries of books matching condition
+SQLITE_SUMMARY_REFRESH = """
+INSERT OR REPLACE INTO book_summaries (book_id, publisher, authors)
+SELECT
+    books.id,
+    CASE WHEN publishers.id IS NOT NULL
+        THEN json_object('id', publishers.id, 'name', publishers.name)
+    END,
+    (
+        SELECT json_group_array(json(author)) FROM (
+            SELECT json_object(
+                'id', authors.id,
+                'first_name', authors.first_name,
+                'last_name', authors.last_name,
+                'middle_name', authors.middle_name
+            ) AS author
+            FROM author_book_association
+            JOIN authors ON authors.id = author_book_association.author_id
+            WHERE author_book_association.book_id = books.id
+            ORDER BY authors.id
+        )
+    )
+FROM books LEFT JOIN publishers ON publishers.id = books.publisher_id
+WHERE {condition};
+"""
+
+# sqlite summary triggers: event, table and refreshed books
+SQLITE_SUMMARY_TRIGGERS = {
+    "books_ai": ("AFTER INSERT ON books", "books.id = new.id"),
+    "books_au": (
+        "AFTER UPDATE OF publisher_id ON books",
+        "books.id = new.id",
+    ),
+    "associations_ai": (
+        "AFTER INSERT ON author_book_association",
+        "books.id = new.book_id",
+    ),
+    "associations_ad": (
+        "AFTER DELETE ON author_book_association",
+        "books.id = old.book_id",
+    ),
+    "authors_au": (
+        "AFTER UPDATE OF first_name, last_name, middle_name ON authors",
+        "books.id IN (SELECT book_id FROM author_book_association "
+        "WHERE author_id = new.id)",
+    ),
+    "publishers_au": (
+        "AFTER UPDATE OF name ON publishers",
+        "books.publisher_id = new.id",
+    ),
+}
+
+for name, (when, condition) in SQLITE_SUMMARY_TRIGGERS.items():
+    event.listen(
+        Base.metadata,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER book_summaries_{name} {when} BEGIN "
+            + SQLITE_SUMMARY_REFRESH.format(condition=condition)
+            + " END"
+        ).execute_if(dialect="sqlite"),
+    )
+# foreign keys may not be enforced by sqlite
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER book_summaries_books_ad AFTER DELETE ON books BEGIN "
+        "DELETE FROM book_summaries WHERE book_id = old.id; END"
+    ).execute_if(dialect="sqlite"),
+)
+
+
+# searchable columns of tables: postgresql has generated tsvector columns
+# created by migrations, sqlite has fts5 external content tables instead
+FULL_TEXT_COLUMNS = {
+    "books": ["title", "description"],
+}
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+# create sqlite fts5 tables kept in sync by triggers
+for table, columns in FULL_TEXT_COLUMNS.items():
+    fts, names = fts_table(table), ", ".join(columns)
+    new, old = (
+        ", ".join(f"{prefix}.{column}" for column in columns)
+        for prefix in ("new", "old")
+    )
+    for statement in (
+        f"CREATE VIRTUAL TABLE {fts} USING fts5"
+        f"({names}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+    ):
+        event.listen(
+            Base.metadata,
+            "after_create",
+            DDL(statement).execute_if(dialect="sqlite"),
+        )
+    event.listen(
+        Base.metadata,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {fts}").execute_if(dialect="sqlite"),
+    )
@@ -0,0 +1,64 @@
+from threading import Lock
+from time import perf_counter
+
+# get sqlalchemy exception
+from sqlalchemy.exc import TimeoutError
+
+# get sqlalchemy pool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+# counters of connection checkouts from pool
+class PoolMetrics:
+    def __init__(self):
+        self.lock = Lock()
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max_seconds = 0.0
+        self.timeouts = 0
+        self.overflows = 0
+
+    def checkout(self, wait: float, overflow: bool, timeout: bool):
+        with self.lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds += wait
+            self.checkout_wait_max_seconds = max(
+                self.checkout_wait_max_seconds, wait
+            )
+            self.overflows += overflow
+            self.timeouts += timeout
+
+    def snapshot(self, pool: AsyncAdaptedQueuePool) -> dict:
+        with self.lock:
+            return {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkout_wait_seconds": self.checkout_wait_seconds,
+                "checkout_wait_max_seconds": self.checkout_wait_max_seconds,
+                "timeouts": self.timeouts,
+                "overflows": self.overflows,
+            }
+
+
+POOL_METRICS = PoolMetrics()
+
+
+# queue pool measuring how long checkouts wait for a connection, including
+# opening new ones, and how often connections beyond pool size are opened
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started, overflow, timeout = perf_counter(), self._overflow, False
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            timeout = True
+            raise
+        finally:
+            POOL_METRICS.checkout(
+                perf_counter() - started,
+                self._overflow > max(overflow, 0),
+                timeout,
+            )
@@ -0,0 +1,150 @@
+from itertools import count
+from time import monotonic, time
+from typing import Optional
+
+# http request and response
+from fastapi import Request, Response
+
+# sqlalchemy engine
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# asgi types and headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# app settings
+from ..settings import settings
+
+# database
+from .database import DATABASE_URL, create_engine, create_sessionmaker
+
+# cookie keeping reads of a client on primary after its write
+STICKY_COOKIE = "library_primary_until"
+
+# scope key of requests that wrote on primary
+STICKY_SCOPE = "library.stick_to_primary"
+
+# methods served by replicas
+READ_METHODS = {"GET", "HEAD"}
+
+
+def replica_url(server: str) -> URL:
+    host, _, port = server.partition(":")
+    return DATABASE_URL.set(host=host, port=int(port) if port else None)
+
+
+class Replica:
+    def __init__(self, url: URL):
+        self.engine = create_engine(url)
+        self.session = create_sessionmaker(self.engine)
+        self.retry_at = 0.0
+
+    def healthy(self) -> bool:
+        return self.retry_at <= monotonic()
+
+    def failed(self):
+        self.retry_at = monotonic() + settings.db_replica_retry_seconds
+
+    def busy(self) -> int:
+        return self.engine.sync_engine.pool.checkedout()
+
+
+# replica engines are created on app startup like primary one
+class ReplicaSet:
+    def __init__(self, servers: list[str], strategy: str):
+        self.servers = servers
+        self.replicas: list[Replica] = []
+        self.strategy = strategy
+        self.counter = count()
+
+    def connect(self):
+        if not self.replicas:
+            self.replicas = [
+                Replica(replica_url(server)) for server in self.servers
+            ]
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+        self.replicas = []
+
+    # pick healthy replica, None when there are none
+    def choose(self) -> Optional[Replica]:
+        if not (healthy := [r for r in self.replicas if r.healthy()]):
+            return None
+        if self.strategy == "least-busy":
+            return min(healthy, key=Replica.busy)
+        return healthy[next(self.counter) % len(healthy)]
+
+
+REPLICAS = ReplicaSet(
+    settings.db_replica_servers,
+    settings.db_replica_strategy,
+)
+
+
+# reads go to primary for a while after a write of the same client
+def is_sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time()
+    except ValueError:
+        return False
+
+
+# response of the request sets sticky cookie, see StickyPrimaryMiddleware
+def stick_to_primary(request: Request):
+    request.scope[STICKY_SCOPE] = True
+
+
+def sticky_cookie() -> str:
+    seconds = settings.db_replica_sticky_seconds
+    response = Response()
+    response.set_cookie(
+        STICKY_COOKIE,
+        str(time() + seconds),
+        max_age=max(int(seconds), 1),
+        httponly=True,
+    )
+    return response.headers["set-cookie"]
+
+
+# sticky cookie is added to whatever response a writing request sends,
+# including responses returned by handlers instead of the injected one
+class StickyPrimaryMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and scope.get(
+                STICKY_SCOPE
+            ):
+                MutableHeaders(scope=message).append(
+                    "set-cookie", sticky_cookie()
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+# open replica session for a read, connecting eagerly so that an unhealthy
+# replica is noticed before the handler runs and primary is used instead
+async def replica_session(request: Request) -> Optional[AsyncSession]:
+    if request.method not in READ_METHODS or is_sticky(request):
+        return None
+    while replica := REPLICAS.choose():
+        session = replica.session()
+        try:
+            await session.connection()
+        except (OSError, SQLAlchemyError):
+            await session.close()
+            replica.failed()
+            continue
+        return session
+    return None
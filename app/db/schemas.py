@@ -1,4 +1,5 @@
-from typing import Optional
+from enum import Enum
+from typing import Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -124,3 +125,81 @@ class Publisher_Books(Publisher):
 
 class Publisher_Books_Authors(Publisher):
     books: Optional[list[Book_Authors]] = Field([], unique_items=True)
+
+
+# models with list previews
+
+
+class Author_BooksPreview(Author):
+    books: list[Book] = Field([], unique_items=True)
+    books_count: int
+
+
+class Publisher_BooksPreview(Publisher):
+    books: list[Book] = Field([], unique_items=True)
+    books_count: int
+
+
+# metrics
+
+
+class PoolMetrics(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    checkout_wait_seconds: float
+    checkout_wait_max_seconds: float
+    timeouts: int
+    overflows: int
+
+
+# bulk
+
+
+class PublisherBulk(PublisherCreate):
+    id: Optional[int] = Field(None, gt=0)
+
+
+class AuthorBulk(AuthorCreate):
+    id: Optional[int] = Field(None, gt=0)
+
+
+class BookBulk(BookCreate):
+    id: Optional[int] = Field(None, gt=0)
+    publisher_id: int = Field(gt=0)
+    author_ids: list[int] = Field(min_items=1, unique_items=True)
+
+
+class BulkErrorDetails(ErrorDetails):
+    loc: list[Union[int, str]] = Field([], title="Location")
+
+
+class BulkError(BaseModel):
+    index: int
+    detail: list[BulkErrorDetails]
+
+
+class BulkResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    ids: list[Optional[int]] = []
+    errors: list[BulkError] = []
+
+
+# jobs
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    done = "done"
+    failed = "failed"
+
+
+class Job(BaseModel):
+    id: str
+    status: JobStatus = JobStatus.queued
+    row_id: Optional[int] = None
+    errors: list[BulkErrorDetails] = []
@@ -0,0 +1,99 @@
+# get sqlalchemy functions
+from sqlalchemy import (
+    column,
+    false,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+)
+
+# get postgresql types
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# database url
+from .database import DATABASE_URL
+
+# get fts table naming
+from .models import fts_table
+
+# full-text search configuration
+TS_CONFIG = "simple"
+
+
+def is_postgresql() -> bool:
+    return DATABASE_URL.get_backend_name() == "postgresql"
+
+
+def ts_query(value: str):
+    return func.websearch_to_tsquery(
+        literal_column(f"'{TS_CONFIG}'::regconfig"), value
+    )
+
+
+def ts_vector(table_name: str, column_name: str):
+    return literal_column(f"{table_name}.{column_name}_tsv", TSVECTOR)
+
+
+# quote every word so user input never breaks fts5 query syntax
+def fts_query(column_name: str, value: str) -> str:
+    words = " ".join(
+        '"{}"'.format(word.replace('"', '""')) for word in value.split()
+    )
+    return f"{column_name} : ({words})"
+
+
+# full-text search predicate
+def search(model, column_name: str, value: str):
+    if is_postgresql():
+        return ts_vector(model.__tablename__, column_name).op("@@")(
+            ts_query(value)
+        )
+    if not value.split():
+        return false()
+    fts = table(fts_table(model.__tablename__), column("rowid"))
+    return model.id.in_(
+        select(fts.c.rowid).where(
+            literal_column(fts.name).op("MATCH")(fts_query(column_name, value))
+        )
+    )
+
+
+# full-text search rank, higher is better
+def search_rank(model, column_name: str, value: str):
+    if is_postgresql():
+        return func.ts_rank(
+            ts_vector(model.__tablename__, column_name),
+            ts_query(value),
+        )
+    if not value.split():
+        return literal(0)
+    # bm25 is lower for better matches
+    fts = table(fts_table(model.__tablename__), column("rowid"))
+    return -(
+        select(func.bm25(literal_column(fts.name)))
+        .select_from(fts)
+        .where(
+            literal_column(fts.name).op("MATCH")(fts_query(column_name, value))
+        )
+        .where(fts.c.rowid == model.id)
+        .scalar_subquery()
+    )
+
+
+# trigram similarity predicate
+def similar(model, column_name: str, value: str):
+    if is_postgresql():
+        return getattr(model, column_name).op("%")(value)
+    # sqlite has no trigram similarity, fall back to substring match
+    return getattr(model, column_name).ilike(f"%{value}%")
+
+
+# trigram similarity rank, higher is better
+def similar_rank(model, column_name: str, value: str):
+    if is_postgresql():
+        return func.similarity(getattr(model, column_name), value)
+    return -func.abs(
+        func.length(getattr(model, column_name)) - func.length(value)
+    )
@@ -0,0 +1,87 @@
+# get sqlalchemy functions
+from sqlalchemy import select, update
+
+# get sqlalchemy async session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# get models
+from . import models
+
+
+# bump row versions matching criteria
+async def bump_versions(session: AsyncSession, model, *criteria):
+    await session.execute(
+        update(model)
+        .where(*criteria)
+        .values(version=model.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# authors and publishers responses embed their books
+async def bump_book_relations(
+    session: AsyncSession,
+    author_ids: set[int],
+    publisher_ids: set[int],
+):
+    if author_ids:
+        await bump_versions(
+            session, models.Author, models.Author.id.in_(author_ids)
+        )
+    if publisher_ids - {None}:
+        await bump_versions(
+            session,
+            models.Publisher,
+            models.Publisher.id.in_(publisher_ids - {None}),
+        )
+
+
+# bump current authors and publishers of books before changing them
+async def bump_books_relations(session: AsyncSession, book_ids: set[int]):
+    await bump_versions(
+        session,
+        models.Author,
+        models.Author.id.in_(
+            select(models.AuthorBookAssociation.author_id).where(
+                models.AuthorBookAssociation.book_id.in_(book_ids)
+            )
+        ),
+    )
+    await bump_versions(
+        session,
+        models.Publisher,
+        models.Publisher.id.in_(
+            select(models.Book.publisher_id).where(models.Book.id.in_(book_ids))
+        ),
+    )
+
+
+# author response embeds its books, and vice versa
+async def bump_authors(session: AsyncSession, author_ids: set[int]):
+    await bump_versions(
+        session, models.Author, models.Author.id.in_(author_ids)
+    )
+    await bump_versions(
+        session,
+        models.Book,
+        models.Book.id.in_(
+            select(models.AuthorBookAssociation.book_id).where(
+                models.AuthorBookAssociation.author_id.in_(author_ids)
+            )
+        ),
+    )
+
+
+# publisher response embeds its books, and vice versa
+async def bump_publishers(session: AsyncSession, publisher_ids: set[int]):
+    await bump_versions(
+        session, models.Publisher, models.Publisher.id.in_(publisher_ids)
+    )
+    await bump_versions(
+        session, models.Book, models.Book.publisher_id.in_(publisher_ids)
+    )
+
+
+# get row version, None if there is no such row
+async def get_version(session: AsyncSession, model, id: int):
+    return await session.scalar(select(model.version).where(model.id == id))
@@ -1,5 +1,8 @@
-# dependency and http status
-from fastapi import Depends, status
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional, Type
+
+# dependency, http request, response and status
+from fastapi import Depends, Request, status
 
 # exceptions
 from fastapi.exceptions import HTTPException, ValidationError
@@ -7,17 +10,41 @@
 # filters
 from fastapi_filter.base.filter import BaseFilterModel, _list_to_str_fields
 
+# pagination
+from fastapi_pagination.bases import AbstractPage
+
 # pydantic exception and model
-from pydantic import ValidationError, create_model
+from pydantic import PrivateAttr, ValidationError, create_model
+
+# get sqlalchemy functions
+from sqlalchemy import exists, select
 
 # get sqlalchemy async session
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# get sqlalchemy clause types
+from sqlalchemy.sql import ClauseElement, Select
+
+# response cache
+from .cache import CACHE, Cache
+
 # database schemas
 from .db import schemas
 
 # database
-from .db.database import ASYNC_SESSION
+from .db.database import DATABASE
+
+# search filter
+from .db.filters import SearchFilter
+
+# read replicas
+from .db.replicas import READ_METHODS, replica_session, stick_to_primary
+
+# batching relationship loader
+from .loaders import Loader
+
+# app settings
+from .settings import settings
 
 # define nor found response
 response_404 = {status.HTTP_404_NOT_FOUND: {"model": schemas.Message}}
@@ -49,47 +76,129 @@ async def raise_404_list(table: str, ids: list[int]):
     )
 
 
-# get async session
-async def get_session() -> AsyncSession:
-    async with ASYNC_SESSION() as session:
+# nested lists are read without their parent row, an empty page raises 404
+# when the parent does not exist; totals may be estimated or cached, so they
+# do not prove the parent exists
+async def check_parent(
+    session: AsyncSession,
+    page: AbstractPage,
+    model,
+    id: int,
+    table: str,
+) -> AbstractPage:
+    if not page.items and not await session.scalar(
+        select(exists().where(model.id == id))
+    ):
+        await raise_404(table)
+    return page
+
+
+# get async session, reads are routed to replicas when there are any
+async def get_session(request: Request) -> AsyncSession:
+    if session := await replica_session(request):
+        async with session:
+            yield session
+        return
+    if request.method not in READ_METHODS:
+        stick_to_primary(request)
+    async with DATABASE.session() as session:
         yield session
 
 
+# get batching loader of the request, shared by dependencies and routes
+async def get_loader(session: AsyncSession = Depends(get_session)) -> Loader:
+    return Loader(session)
+
+
+# get response cache
+async def get_cache() -> Cache:
+    return CACHE
+
+
+class CompiledFilter(NamedTuple):
+    original: BaseFilterModel
+    where: Optional[ClauseElement]
+    order_by: tuple[ClauseElement, ...]
+
+
+# validate filter and build its clauses once per normalized query string
+@lru_cache(maxsize=settings.filter_cache_size)
+def compile_filter(
+    Filter: Type[BaseFilterModel],
+    key: tuple[tuple[str, Any], ...],
+) -> CompiledFilter:
+    try:
+        original_filter = Filter(**dict(key))
+    except ValidationError as e:
+        for error in e.errors():
+            error["loc"] = ["query"] + list(error["loc"])
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(),
+        )
+    model = original_filter.Constants.model
+    order_by = []
+    for field_name in original_filter.ordering_values or []:
+        column = getattr(model, field_name.replace("-", "").replace("+", ""))
+        order_by.append(
+            column.desc() if field_name.startswith("-") else column.asc()
+        )
+    # search filters are ranked by relevance by default
+    if not order_by and isinstance(original_filter, SearchFilter):
+        order_by = original_filter.ranking()
+    return CompiledFilter(
+        original_filter,
+        original_filter.filter(select(model)).whereclause,
+        tuple(order_by),
+    )
+
+
+# generate query parameters model once per filter class
+@lru_cache(maxsize=None)
+def generate_filter(
+    Filter: Type[BaseFilterModel],
+    by_alias: bool,
+) -> Type[BaseFilterModel]:
+    fields = _list_to_str_fields(Filter)
+    GeneratedFilter: BaseFilterModel = create_model(Filter.__name__, **fields)
+
+    class FilterWrapper(GeneratedFilter):
+        _compiled: Optional[CompiledFilter] = PrivateAttr(None)
+
+        def compiled(self) -> CompiledFilter:
+            if self._compiled is None:
+                self._compiled = compile_filter(
+                    Filter,
+                    tuple(
+                        sorted(
+                            self.dict(
+                                by_alias=by_alias,
+                                exclude_none=True,
+                            ).items()
+                        )
+                    ),
+                )
+            return self._compiled
+
+        def original(self) -> BaseFilterModel:
+            return self.compiled().original
+
+        def filter(self, query: Select) -> Select:
+            if (where := self.compiled().where) is not None:
+                return query.where(where)
+            return query
+
+        def sort(self, query: Select) -> Select:
+            return query.order_by(*self.compiled().order_by)
+
+    return FilterWrapper
+
+
 def CustomFilterDepends(
-    Filter: BaseFilterModel,
+    Filter: Type[BaseFilterModel],
     *,
     by_alias: bool = False,
     use_cache: bool = True,
 ):
     """This is a hack to support lists in filters"""
-    fields = _list_to_str_fields(Filter)
-    GeneratedFilter: BaseFilterModel = create_model(
-        Filter.__class__.__name__, **fields
-    )
-
-    class FilterWrapper(GeneratedFilter):
-        def filter(self, *args, **kwargs):
-            try:
-                original_filter = Filter(**self.dict(by_alias=by_alias))
-            except ValidationError as e:
-                for error in e.errors():
-                    error["loc"] = ["query"] + list(error["loc"])
-                raise HTTPException(
-                    status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    detail=e.errors(),
-                )
-            return original_filter.filter(*args, **kwargs)
-
-        def sort(self, *args, **kwargs):
-            try:
-                original_filter = Filter(**self.dict(by_alias=by_alias))
-            except ValidationError as e:
-                for error in e.errors():
-                    error["loc"] = ["query"] + list(error["loc"])
-                raise HTTPException(
-                    status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    detail=e.errors(),
-                )
-            return original_filter.sort(*args, **kwargs)
-
-    return Depends(FilterWrapper, use_cache=use_cache)
+    return Depends(generate_filter(Filter, by_alias), use_cache=use_cache)
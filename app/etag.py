@@ -0,0 +1,86 @@
+from hashlib import blake2b
+from typing import Optional
+
+# http status
+from fastapi import Request, status
+
+# response
+from fastapi.responses import Response
+
+# asgi types and headers
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# strong etag of a single entity response
+def entity_etag(table: str, id: int, version: int) -> str:
+    return f'"{table}-{id}-{version}"'
+
+
+# strong etag of any response body
+def body_etag(body: bytes) -> str:
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+# If-None-Match uses weak comparison
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(
+        tag.strip().removeprefix("W/") in (etag, "*")
+        for tag in if_none_match.split(",")
+    )
+
+
+# get 304 response if client already has the representation
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag},
+        )
+    return None
+
+
+# etag for GET responses that do not set their own, e.g. paginated lists;
+# streaming responses (without content-length) are passed through
+class ETagMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Optional[Message] = None
+        body: list[bytes] = []
+
+        async def send_with_etag(message: Message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] == status.HTTP_200_OK
+                    and "etag" not in headers
+                    and "content-length" in headers
+                ):
+                    start = message
+                    return
+            elif message["type"] == "http.response.body" and start:
+                body.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                headers = MutableHeaders(raw=start["headers"])
+                headers["etag"] = etag = body_etag(content := b"".join(body))
+                if etag_matches(if_none_match, etag):
+                    start["status"] = status.HTTP_304_NOT_MODIFIED
+                    del headers["content-length"]
+                    content = b""
+                await send(start)
+                await send({"type": "http.response.body", "body": content})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
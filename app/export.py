@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+
+from enum import Enum
+from typing import Any, AsyncIterator, Type
+
+# http status
+from fastapi import status
+
+# streaming response
+from fastapi.responses import StreamingResponse
+
+# pydantic model and field shape
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+from pydantic.utils import lenient_issubclass
+
+# get sqlalchemy async session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# get sqlalchemy statement type
+from sqlalchemy.sql import Select
+
+# app settings
+from .settings import settings
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+# define export response
+response_export = {
+    status.HTTP_200_OK: {
+        "content": {
+            media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()
+        }
+    }
+}
+
+
+# csv columns of a schema, nested models are flattened as "parent.field"
+def csv_columns(schema: Type[BaseModel]) -> list[tuple[str, ...]]:
+    columns = []
+    for name, field in schema.__fields__.items():
+        if field.shape == SHAPE_SINGLETON and lenient_issubclass(
+            field.type_, BaseModel
+        ):
+            columns.extend((name, *path) for path in csv_columns(field.type_))
+        else:
+            columns.append((name,))
+    return columns
+
+
+# lists of nested models are written as json
+def csv_value(row: dict, path: tuple[str, ...]) -> Any:
+    for key in path:
+        if row is None:
+            return None
+        row = row[key]
+    return json.dumps(row) if isinstance(row, (list, dict)) else row
+
+
+# stream rows from server-side cursor in chunks, eager loads of every chunk
+# are batched and chunks are dropped from session once serialized
+async def stream_chunks(
+    session: AsyncSession,
+    query: Select,
+    schema: Type[BaseModel],
+) -> AsyncIterator[list[BaseModel]]:
+    result = await session.stream_scalars(
+        query.execution_options(yield_per=settings.export_chunk_size)
+    )
+    async for chunk in result.partitions():
+        yield [schema.from_orm(row) for row in chunk]
+        for row in chunk:
+            session.expunge(row)
+
+
+async def ndjson_lines(
+    chunks: AsyncIterator[list[BaseModel]],
+) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield "".join(f"{row.json()}\n" for row in chunk).encode()
+
+
+async def csv_lines(
+    chunks: AsyncIterator[list[BaseModel]],
+    schema: Type[BaseModel],
+) -> AsyncIterator[bytes]:
+    columns = csv_columns(schema)
+    writer = csv.writer(buffer := io.StringIO())
+    writer.writerow(".".join(path) for path in columns)
+    yield buffer.getvalue().encode()
+    async for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in chunk:
+            row = row.dict()
+            writer.writerow(csv_value(row, path) for path in columns)
+        yield buffer.getvalue().encode()
+
+
+# export query result without building it in memory
+def export_response(
+    session: AsyncSession,
+    query: Select,
+    schema: Type[BaseModel],
+    format: ExportFormat,
+    name: str,
+) -> StreamingResponse:
+    chunks = stream_chunks(session, query, schema)
+    return StreamingResponse(
+        csv_lines(chunks, schema)
+        if format == ExportFormat.csv
+        else ndjson_lines(chunks),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{name}.{format.value}"'
+            )
+        },
+    )
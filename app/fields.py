@@ -0,0 +1,201 @@
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import (
+    ContextManager,
+    NamedTuple,
+    Optional,
+    Type,
+    Union,
+    get_type_hints,
+)
+
+# dependency, query parameter and http status
+from fastapi import Depends, Query, status
+
+# exceptions
+from fastapi.exceptions import HTTPException
+
+# json response
+from fastapi.responses import ORJSONResponse, Response
+
+# pagination
+from fastapi_pagination import set_page
+from fastapi_pagination.bases import AbstractPage
+
+# pydantic model
+from pydantic import BaseModel, create_model
+
+# get sqlalchemy functions
+from sqlalchemy import select
+
+# get sqlalchemy loading strategy
+from sqlalchemy.orm import load_only
+
+# get sqlalchemy select type
+from sqlalchemy.sql import Select
+
+# precompiled serializers
+from .serializers import is_precompiled
+
+# app settings
+from .settings import settings
+
+
+# requested representation of list items
+class Fieldset(NamedTuple):
+    # selected column fields, id is always selected
+    columns: tuple[str, ...]
+    # included relations, loaded in full only when expanded
+    relations: tuple[str, ...]
+    expanded: tuple[str, ...]
+    # model of requested fields
+    schema: Type[BaseModel]
+    # fields or expand were given
+    sparse: bool
+
+    def includes(self, relation: str) -> bool:
+        return relation in self.relations
+
+    def expands(self, relation: str) -> bool:
+        return relation in self.expanded
+
+    # sparse pages are created with their own model
+    def page(self, page: Type[AbstractPage]) -> ContextManager:
+        return set_page(page[self.schema]) if self.sparse else nullcontext()
+
+    # sparse and serialized pages bypass route response model
+    def response(self, page: AbstractPage) -> Union[AbstractPage, Response]:
+        if is_precompiled():
+            return ORJSONResponse(dict(page))
+        if self.sparse:
+            return Response(page.json(), media_type="application/json")
+        return page
+
+
+# raise 422 for unknown fields or relations
+def raise_422_fields(param: str, names: list[str]):
+    raise HTTPException(
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=[
+            {
+                "loc": ["query", param],
+                "msg": f"No such field: {names}.",
+                "type": f"value_error.{param}",
+            }
+        ],
+    )
+
+
+# split comma separated and repeated query values
+def split_names(values: Optional[list[str]]) -> Optional[list[str]]:
+    if values is None:
+        return None
+    return [
+        name.strip()
+        for value in values
+        for name in value.split(",")
+        if name.strip()
+    ]
+
+
+# get model with the given fields of schema, fields are redeclared from
+# annotations as field constraints are already applied to field types
+@lru_cache(maxsize=settings.fields_cache_size)
+def sparse_schema(
+    schema: Type[BaseModel],
+    names: tuple[str, ...],
+) -> Type[BaseModel]:
+    annotations = get_type_hints(schema)
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=schema.__config__,
+        **{
+            name: (annotations[name], field.field_info)
+            for name, field in schema.__fields__.items()
+            if name in names
+        },
+    )
+
+
+# generate fields dependency, relations are given with the schema fields
+# they add to response
+@lru_cache
+def generate_fieldset(
+    schema: Type[BaseModel],
+    relations: tuple[tuple[str, tuple[str, ...]], ...],
+):
+    relation_fields = dict(relations)
+    columns = tuple(
+        name
+        for name in schema.__fields__
+        if not any(name in fields for fields in relation_fields.values())
+    )
+
+    async def fieldset(
+        fields: Optional[list[str]] = Query(
+            None,
+            description=(
+                "Comma separated fields: "
+                + ", ".join(columns + tuple(relation_fields))
+            ),
+        ),
+        expand: Optional[list[str]] = Query(
+            None,
+            description=(
+                "Comma separated relations loaded in full: "
+                + ", ".join(relation_fields)
+            ),
+        ),
+    ) -> Fieldset:
+        names, expanded = split_names(fields), split_names(expand)
+        if unknown := set(names or ()) - set(columns) - set(relation_fields):
+            raise_422_fields("fields", sorted(unknown))
+        if unknown := set(expanded or ()) - set(relation_fields):
+            raise_422_fields("expand", sorted(unknown))
+        if names is None:
+            selected = columns
+            included = (
+                tuple(relation_fields)
+                if expanded is None
+                else tuple(r for r in relation_fields if r in expanded)
+            )
+        else:
+            selected = tuple(c for c in columns if c == "id" or c in names)
+            included = tuple(
+                r
+                for r in relation_fields
+                if r in names or r in (expanded or ())
+            )
+        return Fieldset(
+            columns=selected,
+            relations=included,
+            expanded=tuple(r for r in included if r in (expanded or ())),
+            schema=sparse_schema(
+                schema,
+                selected
+                + tuple(f for r in included for f in relation_fields[r]),
+            ),
+            sparse=fields is not None or expand is not None,
+        )
+
+    return fieldset
+
+
+def FieldsDepends(
+    schema: Type[BaseModel],
+    relations: dict[str, tuple[str, ...]],
+):
+    return Depends(generate_fieldset(schema, tuple(relations.items())))
+
+
+# select only requested columns, foreign keys are kept for relation loading
+# and keys, e.g. of keyset ordering, can be added
+def select_fields(model, fieldset: Fieldset, *keys: str) -> Select:
+    foreign_keys = (
+        attribute.key
+        for attribute in model.__mapper__.column_attrs
+        if any(column.foreign_keys for column in attribute.columns)
+    )
+    return select(model).options(
+        load_only(*dict.fromkeys((*fieldset.columns, *foreign_keys, *keys)))
+    )
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from uuid import uuid4
+
+# http status and exceptions
+from fastapi import status
+from fastapi.exceptions import HTTPException
+
+# json response
+from fastapi.responses import JSONResponse
+
+# get sqlalchemy async session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# response cache and job store
+from .cache import CACHE, Cache, MemoryCache, RedisCache, redis_client
+
+# database schemas
+from .db import schemas
+
+# database
+from .db.database import DATABASE
+
+# app settings
+from .settings import settings
+
+LOGGER = logging.getLogger(__name__)
+
+# define accepted response
+response_202 = {
+    status.HTTP_202_ACCEPTED: {
+        "model": schemas.Job,
+        "description": "Queued with Prefer: respond-async, see Location.",
+    }
+}
+
+
+# queued write of a row, id is None for creates
+class Write(NamedTuple):
+    job: schemas.Job
+    id: Optional[int]
+    data: dict[str, Any]
+
+
+WriteHandler = Callable[[AsyncSession, Cache, list[Write]], Awaitable[None]]
+
+# job statuses, shared by workers through redis; other cache backends keep
+# statuses of the last jobs in the process which accepted them
+def create_job_store() -> Cache:
+    if (client := redis_client()) is not None:
+        return RedisCache(
+            client, settings.write_queue_jobs_ttl, prefix="library:job:"
+        )
+    return MemoryCache(settings.write_queue_jobs, settings.write_queue_jobs_ttl)
+
+
+JOBS = create_job_store()
+
+
+# jobs are read from any worker, statuses kept by the process need one
+def check_job_store():
+    if (
+        settings.write_queue_enabled
+        and settings.app_workers > 1
+        and settings.cache_backend != "redis"
+    ):
+        raise RuntimeError(
+            "Write queue with several workers requires the redis cache backend"
+        )
+
+
+async def get_job(job_id: str) -> Optional[schemas.Job]:
+    if (value := await JOBS.get(job_id)) is None:
+        return None
+    return schemas.Job.parse_raw(value)
+
+
+async def save_job(job: schemas.Job):
+    await JOBS.set(job.id, job.json().encode())
+
+
+def finish(
+    job: schemas.Job,
+    row_id: Optional[int],
+    errors: Optional[list[schemas.BulkErrorDetails]] = None,
+):
+    job.row_id, job.errors = row_id, errors or []
+    job.status = schemas.JobStatus.failed if errors else schemas.JobStatus.done
+
+
+# client asks to get 202 instead of waiting for the write
+def respond_async(prefer: Optional[str]) -> bool:
+    return settings.write_queue_enabled and "respond-async" in (prefer or "")
+
+
+# in-memory write-behind queue: writes are coalesced into batches handled in
+# one transaction, the queue is not durable, see write queue settings
+class WriteQueue:
+    def __init__(self, handler: WriteHandler):
+        self.handler = handler
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+
+    # queue write and respond with its job, 503 when queue is full
+    async def submit(self, id: Optional[int], data: dict) -> JSONResponse:
+        if self.worker is None:
+            self.queue = asyncio.Queue(settings.write_queue_size)
+            self.worker = asyncio.create_task(self.run())
+        # job is saved before it is queued, so that its queued status never
+        # overwrites the status of its write
+        await save_job(job := schemas.Job(id=uuid4().hex))
+        try:
+            self.queue.put_nowait(Write(job, id, data))
+        except asyncio.QueueFull:
+            await JOBS.invalidate(job.id)
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=[{"msg": "Write queue is full.", "type": "queue_full"}],
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(
+            job.dict(),
+            status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+
+    # collect writes until batch is full or interval has passed since the
+    # first one
+    async def batch(self) -> list[Write]:
+        loop = asyncio.get_running_loop()
+        writes = [await self.queue.get()]
+        deadline = loop.time() + settings.write_queue_interval_ms / 1000
+        while len(writes) < settings.write_queue_batch_size:
+            try:
+                writes.append(
+                    await asyncio.wait_for(
+                        self.queue.get(), deadline - loop.time()
+                    )
+                )
+            except asyncio.TimeoutError:
+                break
+        return writes
+
+    async def run(self):
+        while True:
+            writes = await self.batch()
+            try:
+                async with DATABASE.session() as session:
+                    await self.handler(session, CACHE, writes)
+            except Exception as e:
+                LOGGER.exception("Write batch failed")
+                for write in writes:
+                    if write.job.status == schemas.JobStatus.queued:
+                        finish(
+                            write.job,
+                            None,
+                            [
+                                schemas.BulkErrorDetails(
+                                    msg=f"Batch failed: {e.__class__.__name__}.",
+                                    type="bulk.batch_failed",
+                                )
+                            ],
+                        )
+            try:
+                for write in writes:
+                    await save_job(write.job)
+            except Exception:
+                LOGGER.exception("Job statuses not saved")
+            finally:
+                for _ in writes:
+                    self.queue.task_done()
+
+    # write queued writes and stop worker
+    async def close(self):
+        if self.worker is not None:
+            await self.queue.join()
+            self.worker.cancel()
+            self.worker = None
+
+
+QUEUES: list[WriteQueue] = []
+
+
+def create_queue(handler: WriteHandler) -> WriteQueue:
+    QUEUES.append(queue := WriteQueue(handler))
+    return queue
+
+
+async def close_queues():
+    for queue in QUEUES:
+        await queue.close()
@@ -0,0 +1,138 @@
+from collections import defaultdict
+from typing import Any, Iterable, NamedTuple, Sequence, Union
+
+# get sqlalchemy functions
+from sqlalchemy import select
+
+# get sqlalchemy async session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# get models
+from .db import models
+
+# items transform of pagination
+from .pagination import Transform
+
+# rows with overridden attributes
+from .previews import Preview
+
+
+# relation of parent rows to child rows: links are (parent id, child id)
+# pairs read from key columns, children are then loaded by id; many-to-one
+# relations are read from the foreign key of parent rows
+class Relation(NamedTuple):
+    model: Any
+    parent_key: Any
+    child_key: Any
+    many: bool = True
+
+
+BOOK_AUTHORS = Relation(
+    models.Author,
+    models.AuthorBookAssociation.book_id,
+    models.AuthorBookAssociation.author_id,
+)
+BOOK_PUBLISHER = Relation(
+    models.Publisher,
+    models.Book.id,
+    models.Book.publisher_id,
+    many=False,
+)
+AUTHOR_BOOKS = Relation(
+    models.Book,
+    models.AuthorBookAssociation.author_id,
+    models.AuthorBookAssociation.book_id,
+)
+PUBLISHER_BOOKS = Relation(
+    models.Book,
+    models.Book.publisher_id,
+    models.Book.id,
+)
+
+# relations attached to rows by name, with relations of children
+Relations = dict[str, Union[Relation, tuple[Relation, "Relations"]]]
+
+
+# request-scoped batching loader: rows are kept by model and id, so every
+# entity is loaded once per request however many parents embed it, and a
+# relation costs one link query and one row query for all parents at once
+class Loader:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.rows: dict[Any, dict[int, Any]] = defaultdict(dict)
+
+    # keep rows loaded by other queries, e.g. page items
+    def add(self, model, rows: Iterable[Any]):
+        self.rows[model].update((row.id, row) for row in rows)
+
+    # rows of model by id, ids not loaded yet are loaded in one query
+    async def load(self, model, ids: Iterable[int]) -> dict[int, Any]:
+        rows = self.rows[model]
+        if missing := set(ids) - rows.keys() - {None}:
+            self.add(
+                model,
+                await self.session.scalars(
+                    select(model).where(model.id.in_(missing))
+                ),
+            )
+        return rows
+
+    async def links(
+        self, relation: Relation, parents: Sequence[Any]
+    ) -> list[tuple[int, int]]:
+        if not relation.many:
+            return [
+                (parent.id, getattr(parent, relation.child_key.key))
+                for parent in parents
+            ]
+        return (
+            await self.session.execute(
+                select(relation.parent_key, relation.child_key)
+                .where(relation.parent_key.in_([p.id for p in parents]))
+                .order_by(relation.parent_key, relation.child_key)
+            )
+        ).all()
+
+    # rows with relations attached as attributes, nested relations are
+    # loaded for children of all rows at once; links and rows are read by
+    # separate statements, so links to rows deleted in between are skipped
+    async def attach(
+        self, rows: Sequence[Any], relations: Relations
+    ) -> list[Preview]:
+        if not rows:
+            return []
+        attributes = {row.id: {} for row in rows}
+        for name, relation in relations.items():
+            relation, nested = (
+                (relation, {}) if isinstance(relation, Relation) else relation
+            )
+            links = await self.links(relation, rows)
+            children = await self.load(
+                relation.model, (child for _, child in links)
+            )
+            if nested:
+                linked = {id: children[id] for _, id in links if id in children}
+                children = {
+                    child.id: child
+                    for child in await self.attach(
+                        list(linked.values()), nested
+                    )
+                }
+            for id in attributes:
+                attributes[id][name] = [] if relation.many else None
+            for parent, child in links:
+                if (row := children.get(child)) is None:
+                    continue
+                if relation.many:
+                    attributes[parent][name].append(row)
+                else:
+                    attributes[parent][name] = row
+        return [Preview(row, **attributes[row.id]) for row in rows]
+
+    # page transform attaching relations to items
+    def transform(self, model, relations: Relations) -> Transform:
+        async def transform(rows: Sequence[Any]) -> list[Preview]:
+            self.add(model, rows)
+            return await self.attach(rows, relations)
+
+        return transform
@@ -5,15 +5,43 @@
 from fastapi.exceptions import RequestValidationError
 
 # redirect & json response
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, RedirectResponse
 
 # pagination
 from fastapi_pagination import add_pagination
 
+# database
+from .db.database import DATABASE
+
+# read replicas
+from .db.replicas import REPLICAS, StickyPrimaryMiddleware
+
+# conditional requests
+from .etag import ETagMiddleware
+
+# write-behind queue
+from .jobs import check_job_store, close_queues
+
+# request metrics
+from .metrics import MetricsMiddleware, instrument_routes
+
+# query budgets
+from .queries import install_query_log
+
 # event router
-from .routers import authors, books, publishers
+from .routers import authors, books, jobs, metrics, publishers
+
+# fast json response
+from .serializers import is_precompiled
 
-app = FastAPI()
+# app settings
+from .settings import settings
+
+app = FastAPI(
+    default_response_class=ORJSONResponse if is_precompiled() else JSONResponse
+)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(StickyPrimaryMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -29,6 +57,27 @@ async def validation_exception_handler(_, exc):
 app.include_router(publishers.router)
 app.include_router(authors.router)
 app.include_router(books.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+
+
+# engines are created by every worker process, pool is warmed before the
+# server accepts connections
+@app.on_event("startup")
+async def startup():
+    check_job_store()
+    DATABASE.connect()
+    REPLICAS.connect()
+    if settings.db_pool_warm:
+        await DATABASE.warm(settings.db_pool_size)
+
+
+# queued writes are written before engines are disposed
+@app.on_event("shutdown")
+async def shutdown():
+    await close_queues()
+    await REPLICAS.dispose()
+    await DATABASE.dispose()
 
 
 @app.get("/", include_in_schema=False)
@@ -37,3 +86,11 @@ async def home_page():
 
 
 add_pagination(app)
+
+# query log runs inside metrics and logs statements on their request stats
+if settings.query_log_enabled:
+    install_query_log(app)
+
+if settings.metrics_enabled:
+    instrument_routes(app)
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,294 @@
+from asyncio import iscoroutinefunction
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Any, Iterable, Optional
+
+# API and routes
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+# sqlalchemy events and engine
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# asgi types
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# database engine and models
+from .db.database import DATABASE
+from .db.models import Base
+
+# pool instrumentation
+from .db.pool import POOL_METRICS
+
+# label of requests not matching any route, keeps label values bounded
+UNMATCHED = "unmatched"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 5000)
+BYTES_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    labels = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return f"{{{labels}}}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for values, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, values)} {value}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = SECONDS_BUCKETS,
+    ):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = buckets
+        # per labels: counts of every bucket, then +Inf, and sum
+        self.values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: tuple, value: float):
+        counts, total = self.values.setdefault(
+            labels, ([0] * (len(self.buckets) + 1), [0.0])
+        )
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        counts[-1] += 1
+        total[0] += value
+
+    def samples(self) -> Iterable[str]:
+        names = (*self.labels, "le")
+        for values, (counts, total) in self.values.items():
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                labels = format_labels(names, (*values, bound))
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = format_labels(self.labels, values)
+            yield f"{self.name}_sum{labels} {total[0]}"
+            yield f"{self.name}_count{labels} {counts[-1]}"
+
+
+# metrics of this process, every worker exposes its own
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        # pool state is read when scraped
+        if DATABASE.engine is not None:
+            pool = DATABASE.engine.sync_engine.pool
+            for name, value in POOL_METRICS.snapshot(pool).items():
+                lines.append(f"# TYPE library_db_pool_{name} gauge")
+                lines.append(f"library_db_pool_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+ROUTE = ("method", "route")
+
+REQUESTS = REGISTRY.register(
+    Counter(
+        "library_http_requests_total",
+        "HTTP requests by route template and status.",
+        (*ROUTE, "status"),
+    )
+)
+REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "library_http_request_duration_seconds",
+        "Time from request to end of response.",
+        ROUTE,
+    )
+)
+REQUEST_QUERIES = REGISTRY.register(
+    Histogram(
+        "library_request_db_queries",
+        "SQL statements executed per request.",
+        ROUTE,
+        COUNT_BUCKETS,
+    )
+)
+REQUEST_DB_DURATION = REGISTRY.register(
+    Histogram(
+        "library_request_db_duration_seconds",
+        "Time spent executing SQL statements per request.",
+        ROUTE,
+    )
+)
+REQUEST_ROWS = REGISTRY.register(
+    Histogram(
+        "library_request_rows_hydrated",
+        "ORM instances loaded per request.",
+        ROUTE,
+        COUNT_BUCKETS,
+    )
+)
+REQUEST_SERIALIZATION = REGISTRY.register(
+    Histogram(
+        "library_request_serialization_duration_seconds",
+        "Time from handler return to response start: response model "
+        "validation, encoding and rendering.",
+        ROUTE,
+    )
+)
+RESPONSE_SIZE = REGISTRY.register(
+    Histogram(
+        "library_http_response_size_bytes",
+        "Response body size.",
+        ROUTE,
+        BYTES_BUCKETS,
+    )
+)
+
+
+# route templates by endpoint, router stores matched endpoint in scope
+ROUTE_PATHS: dict = {}
+
+
+# measurements of the current request
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.returned_at: Optional[float] = None
+        # statement log of query budgets when enabled, see queries
+        self.log: Optional[Any] = None
+
+
+REQUEST_STATS: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+# start time and logged statement are kept on the execution context of the
+# statement, so that a failing statement leaves nothing behind on the pooled
+# connection
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if context is None or (stats := REQUEST_STATS.get()) is None:
+        return
+    if stats.log is not None:
+        context.logged_statement = stats.log.record(
+            conn.engine, statement, parameters, many
+        )
+    context.query_started = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if (stats := REQUEST_STATS.get()) is None or (
+        started := getattr(context, "query_started", None)
+    ) is None:
+        return
+    seconds = perf_counter() - started
+    stats.queries += 1
+    stats.query_seconds += seconds
+    if logged := getattr(context, "logged_statement", None):
+        logged.seconds = seconds
+
+
+@event.listens_for(Base, "load", propagate=True)
+def load(target, context):
+    if (stats := REQUEST_STATS.get()) is not None:
+        stats.rows += 1
+
+
+# record route templates and handler return time of every route endpoint
+def instrument_routes(app: FastAPI):
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            ROUTE_PATHS[route.endpoint] = route.path
+            if iscoroutinefunction(route.dependant.call):
+                route.dependant.call = timed_endpoint(route.dependant.call)
+
+
+def timed_endpoint(call):
+    @wraps(call)
+    async def endpoint(*args, **kwargs):
+        try:
+            return await call(*args, **kwargs)
+        finally:
+            if (stats := REQUEST_STATS.get()) is not None:
+                stats.returned_at = perf_counter()
+
+    return endpoint
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, started, status, size = RequestStats(), perf_counter(), 500, 0
+        token = REQUEST_STATS.set(stats)
+        serialized: Optional[float] = None
+
+        async def send_with_metrics(message: Message):
+            nonlocal status, size, serialized
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats.returned_at is not None:
+                    serialized = perf_counter() - stats.returned_at
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            REQUEST_STATS.reset(token)
+            labels = (
+                scope["method"],
+                ROUTE_PATHS.get(scope.get("endpoint"), UNMATCHED),
+            )
+            REQUESTS.inc((*labels, status))
+            REQUEST_DURATION.observe(labels, perf_counter() - started)
+            REQUEST_QUERIES.observe(labels, stats.queries)
+            REQUEST_DB_DURATION.observe(labels, stats.query_seconds)
+            REQUEST_ROWS.observe(labels, stats.rows)
+            RESPONSE_SIZE.observe(labels, size)
+            if serialized is not None:
+                REQUEST_SERIALIZATION.observe(labels, serialized)
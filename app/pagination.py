@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import json
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from enum import Enum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Generic,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+# dependency and http status
+from fastapi import Query, status
+
+# exceptions
+from fastapi.exceptions import HTTPException
+
+# filters
+from fastapi_filter.contrib.sqlalchemy import Filter
+
+# pagination
+from fastapi_pagination import Page as BasePage
+from fastapi_pagination import Params as BaseParams
+from fastapi_pagination import resolve_params
+from fastapi_pagination.api import page_type
+from fastapi_pagination.bases import AbstractPage, AbstractParams, RawParams
+from fastapi_pagination.ext.sqlalchemy import count_query, paginate_query
+
+# pydantic model
+from pydantic import BaseModel, conint
+
+# get sqlalchemy functions
+from sqlalchemy import Table, and_, false, or_, text, tuple_
+
+# get sqlalchemy async session and select type
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# sqlalchemy statement compilation
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+# count cache
+from .cache import MemoryCache
+
+# precompiled serializers
+from .serializers import compile_serializer, is_precompiled
+
+# app settings
+from .settings import settings
+
+T = TypeVar("T")
+
+# rewrites page items before page is created, e.g. to attach related rows
+Transform = Callable[[Sequence[Any]], Awaitable[Sequence[Any]]]
+
+
+# how total of a page is counted: exact COUNT(*), planner estimate, exact
+# count cached per query for count cache ttl, or not counted at all
+class CountStrategy(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    cached = "cached"
+    none = "none"
+
+
+class Params(BaseParams):
+    count: CountStrategy = Query(
+        CountStrategy(settings.count_strategy),
+        description="How total is counted",
+    )
+
+
+# offset page telling which kind of total it carries
+class Page(BasePage[T], Generic[T]):
+    total: Optional[conint(ge=0)]  # type: ignore
+    total_kind: CountStrategy
+
+    __params_type__ = Params
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        total: Optional[int],
+        params: AbstractParams,
+        *,
+        total_kind: CountStrategy = CountStrategy.exact,
+    ) -> Page[T]:
+        if not isinstance(params, Params):
+            raise ValueError("Page should be used with Params")
+
+        return cls(
+            total=total,
+            total_kind=total_kind,
+            items=items,
+            page=params.page,
+            size=params.size,
+        )
+
+
+class CursorParams(BaseModel, AbstractParams):
+    cursor: Optional[str] = Query(None, description="Page cursor")
+    size: int = Query(50, ge=1, le=100, description="Page size")
+
+    def to_raw_params(self) -> RawParams:
+        return RawParams(limit=self.size, offset=0)
+
+
+class CursorPage(AbstractPage[T], Generic[T]):
+    items: Sequence[T]
+    size: conint(ge=1)  # type: ignore
+    next_cursor: Optional[str]
+
+    __params_type__ = CursorParams
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        total: Optional[int],
+        params: AbstractParams,
+        *,
+        next_cursor: Optional[str] = None,
+    ) -> CursorPage[T]:
+        if not isinstance(params, CursorParams):
+            raise ValueError("CursorPage should be used with CursorParams")
+
+        return cls(
+            items=items,
+            size=params.size,
+            next_cursor=next_cursor,
+        )
+
+
+# raise 422 for malformed or foreign cursor
+def raise_422_cursor():
+    raise HTTPException(
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=[
+            {
+                "loc": ["query", "cursor"],
+                "msg": "Invalid cursor.",
+                "type": "value_error.cursor",
+            }
+        ],
+    )
+
+
+# encode order keys and values of the last row into an opaque string
+def encode_cursor(keys: list[str], values: list[Any]) -> str:
+    return (
+        urlsafe_b64encode(
+            json.dumps([keys, values], separators=(",", ":")).encode()
+        )
+        .rstrip(b"=")
+        .decode()
+    )
+
+
+# whether decoded value can be compared with key column, NULL only for
+# nullable keys and bool is not taken for an integer
+def is_key_value(column, value: Any) -> bool:
+    if value is None:
+        return is_nullable(column)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return True
+    if python_type is float:
+        python_type = (int, float)
+    return isinstance(value, python_type) and (
+        python_type is bool or not isinstance(value, bool)
+    )
+
+
+# decode cursor, it must belong to the same ordering and its values must
+# match types of key columns
+def decode_cursor(cursor: str, keys: list[tuple[str, Any, bool]]) -> list[Any]:
+    try:
+        cursor_keys, values = json.loads(
+            urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (DecodeError, UnicodeDecodeError, ValueError, TypeError):
+        raise_422_cursor()
+    if (
+        cursor_keys != [name for name, *_ in keys]
+        or not isinstance(values, list)
+        or len(values) != len(keys)
+        or not all(
+            is_key_value(column, value)
+            for (_, column, _), value in zip(keys, values)
+        )
+    ):
+        raise_422_cursor()
+    return values
+
+
+# get (key, column, descending) from filter ordering with id as tiebreaker,
+# in direction of the last key so that a (key, id) index serves both
+# directions
+def ordering_keys(_filter: Filter) -> list[tuple[str, Any, bool]]:
+    model = _filter.Constants.model
+    keys = []
+    for field_name in _filter.ordering_values or []:
+        key = field_name.replace("-", "").replace("+", "")
+        keys.append((key, getattr(model, key), field_name.startswith("-")))
+    if "id" not in (key for key, *_ in keys):
+        keys.append(("id", model.id, bool(keys) and keys[-1][2]))
+    return keys
+
+
+# create page of current page type, with precompiled serializers items are
+# serialized from rows instead of being validated by page item model
+def create_page(
+    items: Sequence[Any],
+    total: Optional[int],
+    params: AbstractParams,
+    **kwargs: Any,
+) -> AbstractPage:
+    page = page_type.get()
+    if not is_precompiled():
+        return page.create(items, total, params, **kwargs)
+    serialize = compile_serializer(page.__fields__["items"].type_)
+    created = page.create([], total, params, **kwargs)
+    created.items = [serialize(item) for item in items]
+    return created
+
+
+# names of keys that must be loaded to build cursor
+def ordering_names(_filter: Filter) -> list[str]:
+    return [name for name, *_ in ordering_keys(_filter)]
+
+
+def is_nullable(column) -> bool:
+    return column.property.columns[0].nullable
+
+
+# order by keys, NULLs always come last so that seek predicate is portable
+def order_by_keys(query: Select, keys: list[tuple[str, Any, bool]]) -> Select:
+    for _, column, desc in keys:
+        clause = column.desc() if desc else column.asc()
+        query = query.order_by(
+            clause.nulls_last() if is_nullable(column) else clause
+        )
+    return query
+
+
+# build WHERE predicate selecting rows strictly after values
+def seek_predicate(keys: list[tuple[str, Any, bool]], values: list[Any]):
+    # plain row value comparison can use a composite index
+    if len({desc for *_, desc in keys}) == 1 and not any(
+        is_nullable(column) for _, column, _ in keys
+    ):
+        left = tuple_(*(column for _, column, _ in keys))
+        right = tuple_(*values)
+        return left < right if keys[0][2] else left > right
+    # mixed directions or nullable keys need an expanded predicate
+    clauses, equal = [], []
+    for (_, column, desc), value in zip(keys, values):
+        if value is None:
+            after = false()
+        else:
+            after = column < value if desc else column > value
+            if is_nullable(column):
+                after = or_(after, column.is_(None))
+        clauses.append(and_(*equal, after))
+        equal.append(column.is_(None) if value is None else column == value)
+    return or_(*clauses)
+
+
+async def paginate_keyset(
+    session: AsyncSession,
+    query: Select,
+    _filter: Filter,
+    params: Optional[AbstractParams] = None,
+    *,
+    transform: Optional[Transform] = None,
+) -> CursorPage:
+    params = resolve_params(params)
+
+    keys = ordering_keys(_filter)
+    names = [name for name, *_ in keys]
+    if params.cursor:
+        query = query.where(
+            seek_predicate(keys, decode_cursor(params.cursor, keys))
+        )
+
+    # fetch one extra row to know whether there is a next page
+    items = (
+        await session.scalars(order_by_keys(query, keys).limit(params.size + 1))
+    ).all()
+
+    next_cursor = None
+    if len(items) > params.size:
+        items = items[: params.size]
+        next_cursor = encode_cursor(
+            names, [getattr(items[-1], name) for name in names]
+        )
+
+    return create_page(
+        await transform(items) if transform else items,
+        None,
+        params,
+        next_cursor=next_cursor,
+    )
+
+
+# EXPLAIN of a statement with its plan as JSON
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+# exact counts of queries, keyed by their SQL and parameters
+COUNTS = MemoryCache(settings.count_cache_size, settings.count_cache_ttl)
+
+
+def count_key(session: AsyncSession, query: Select) -> str:
+    compiled = query.compile(session.get_bind())
+    return f"{compiled}:{sorted(compiled.params.items(), key=str)!r}"
+
+
+# table of an unfiltered single table query, its size is in statistics
+def whole_table(query: Select) -> Optional[Table]:
+    froms = query.get_final_froms()
+    if (
+        query.whereclause is None
+        and not query._group_by_clauses
+        and not query._distinct
+        and len(froms) == 1
+        and isinstance(froms[0], Table)
+    ):
+        return froms[0]
+    return None
+
+
+# row estimate of postgresql planner, None for other dialects or tables
+# never analyzed
+async def estimate_count(session: AsyncSession, query: Select) -> Optional[int]:
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+    if (table := whole_table(query)) is not None:
+        rows = await session.scalar(
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = to_regclass(:name)"
+            ),
+            {"name": table.fullname},
+        )
+        if rows is not None and rows >= 0:
+            return rows
+    plan = await session.scalar(Explain(query.order_by(None)))
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+# count total by strategy, strategies the database cannot serve fall back
+# to exact count
+async def count_total(
+    session: AsyncSession, query: Select, strategy: CountStrategy
+) -> tuple[Optional[int], CountStrategy]:
+    if strategy == CountStrategy.none:
+        return None, strategy
+    if strategy == CountStrategy.estimated:
+        if (total := await estimate_count(session, query)) is not None:
+            return total, strategy
+        strategy = CountStrategy.exact
+    query = count_query(query)
+    if strategy == CountStrategy.cached:
+        if (
+            value := await COUNTS.get(key := count_key(session, query))
+        ) is None:
+            value = str(await session.scalar(query)).encode()
+            await COUNTS.set(key, value)
+        return int(value), strategy
+    return await session.scalar(query), strategy
+
+
+# offset pagination of fastapi_pagination with items transform and count
+# strategies
+async def paginate_offset(
+    session: AsyncSession,
+    query: Select,
+    params: Optional[AbstractParams] = None,
+    *,
+    transform: Optional[Transform] = None,
+) -> AbstractPage:
+    params = resolve_params(params)
+
+    total, total_kind = await count_total(
+        session, query, getattr(params, "count", CountStrategy.exact)
+    )
+    items = (await session.scalars(paginate_query(query, params))).all()
+
+    return create_page(
+        await transform(items) if transform else items,
+        total,
+        params,
+        total_kind=total_kind,
+    )
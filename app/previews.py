@@ -0,0 +1,101 @@
+from typing import Any, Optional, Sequence
+
+# get sqlalchemy functions
+from sqlalchemy import func, select
+
+# get sqlalchemy async session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# get sqlalchemy aliasing
+from sqlalchemy.orm import aliased
+
+# items transform of pagination
+from .pagination import Transform
+
+# app settings
+from .settings import settings
+
+
+# row with overridden attributes, read by schema.from_orm
+class Preview:
+    def __init__(self, row: Any, **attributes: Any):
+        self.row, self.attributes = row, attributes
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self.attributes:
+            return self.attributes[name]
+        return getattr(self.row, name)
+
+
+# first rows and row counts of collections of several parents in one query,
+# rows are numbered and counted per parent by window functions
+async def load_previews(
+    session: AsyncSession,
+    model,
+    parent_id,
+    parent_ids: list[int],
+    join: Optional[Any] = None,
+) -> dict[int, tuple[list[Any], int]]:
+    ranked = select(
+        model,
+        parent_id.label("parent_id"),
+        func.row_number()
+        .over(partition_by=parent_id, order_by=model.id)
+        .label("position"),
+        func.count().over(partition_by=parent_id).label("total"),
+    )
+    if join is not None:
+        ranked = ranked.join(join)
+    ranked = ranked.where(parent_id.in_(parent_ids)).subquery()
+    row = aliased(model, ranked)
+    # first row is always fetched to get the count
+    previews = {}
+    for item, id, total in await session.execute(
+        select(row, ranked.c.parent_id, ranked.c.total)
+        .where(ranked.c.position <= max(settings.preview_size, 1))
+        .order_by(ranked.c.parent_id, ranked.c.position)
+    ):
+        items, _ = previews.setdefault(id, ([], total))
+        if len(items) < settings.preview_size:
+            items.append(item)
+    return previews
+
+
+# page transform attaching collection previews with counts, or counts of
+# collections already loaded in full when expanded
+def collection_previews(
+    session: AsyncSession,
+    collection: str,
+    model,
+    parent_id,
+    expanded: bool,
+    join: Optional[Any] = None,
+) -> Transform:
+    async def transform(rows: Sequence[Any]) -> list[Preview]:
+        if expanded:
+            return [
+                Preview(
+                    row,
+                    **{f"{collection}_count": len(getattr(row, collection))},
+                )
+                for row in rows
+            ]
+        previews = (
+            await load_previews(
+                session, model, parent_id, [row.id for row in rows], join
+            )
+            if rows
+            else {}
+        )
+        items = []
+        for row in rows:
+            preview, count = previews.get(row.id, ([], 0))
+            items.append(
+                Preview(
+                    row,
+                    **{collection: preview, f"{collection}_count": count},
+                )
+            )
+        return items
+
+    return transform
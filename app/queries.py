@@ -0,0 +1,161 @@
+import logging
+
+from typing import Optional
+
+# API
+from fastapi import FastAPI
+
+# sqlalchemy engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# asgi types
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# request measurements and their statement listeners
+from .metrics import REQUEST_STATS, RequestStats
+
+# app settings
+from .settings import settings
+
+LOGGER = logging.getLogger(__name__)
+
+# plan statements of dialects, other dialects are logged without plans
+EXPLAIN = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+
+# statements planned, writes are not repeated
+EXPLAINED = ("SELECT", "WITH")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+# declare most statements a route may execute, None for no limit (e.g.
+# bulk writes); routes without declaration get query_budget setting
+def query_budget(queries: Optional[int]):
+    def declare(endpoint):
+        endpoint.query_budget = queries
+        return endpoint
+
+    return declare
+
+
+class Statement:
+    def __init__(self, engine: Engine, statement: str, parameters, many):
+        self.engine, self.statement = engine, statement
+        self.parameters, self.many = parameters, many
+        self.seconds = 0.0
+
+    async def explain(self) -> Optional[str]:
+        prefix = EXPLAIN.get(self.engine.dialect.name)
+        statement = self.statement.lstrip().upper()
+        if not prefix or self.many or not statement.startswith(EXPLAINED):
+            return None
+        async with AsyncEngine(self.engine).connect() as conn:
+            rows = await conn.exec_driver_sql(
+                prefix + self.statement, self.parameters
+            )
+            return "\n".join(
+                " ".join(str(value) for value in row) for row in rows
+            )
+
+
+# statements executed by the current request
+class QueryLog:
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.statements: list[Statement] = []
+
+    def budget(self) -> Optional[int]:
+        return getattr(
+            self.scope.get("endpoint"), "query_budget", settings.query_budget
+        )
+
+    def seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    # log statement before it executes, strict mode fails the request once
+    # its budget is exceeded
+    def record(self, engine: Engine, statement: str, parameters, many):
+        self.statements.append(
+            current := Statement(engine, statement, parameters, many)
+        )
+        if settings.query_strict and self.exceeded():
+            raise QueryBudgetExceeded(
+                f"{self.summary()}\n"
+                + "\n".join(s.statement for s in self.statements)
+            )
+        return current
+
+    def exceeded(self) -> bool:
+        budget = self.budget()
+        return budget is not None and len(self.statements) > budget
+
+    def slowest(self) -> list[Statement]:
+        return sorted(self.statements, key=lambda s: s.seconds, reverse=True)[
+            : settings.query_slowest
+        ]
+
+    def summary(self) -> str:
+        return (
+            f"{self.scope['method']} {self.scope['path']}: "
+            f"{len(self.statements)} queries (budget {self.budget()}), "
+            f"{self.seconds() * 1e3:.1f} ms"
+        )
+
+
+# log statements of request with plans of slowest ones when it went over
+# its budget or has slow statements
+async def report(log: QueryLog):
+    slowest = log.slowest()
+    if not log.exceeded() and not (
+        slowest and slowest[0].seconds >= settings.query_slow_seconds
+    ):
+        LOGGER.info(log.summary())
+        return
+    lines = [log.summary()]
+    for statement in slowest:
+        lines.append(f"{statement.seconds * 1e3:.1f} ms: {statement.statement}")
+        try:
+            plan = await statement.explain()
+        except Exception as exc:
+            plan = f"no plan: {exc!r}"
+        if plan:
+            lines.append(plan)
+    LOGGER.warning("\n".join(lines))
+
+
+class QueryLogMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # statements are logged by the statement listeners of metrics, stats
+        # of the request are created here when metrics are disabled
+        token = None
+        if (stats := REQUEST_STATS.get()) is None:
+            token = REQUEST_STATS.set(stats := RequestStats())
+        stats.log = log = QueryLog(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats.log = None
+            if token is not None:
+                REQUEST_STATS.reset(token)
+            # plans are not statements of the request
+            token = REQUEST_STATS.set(None)
+            try:
+                await report(log)
+            finally:
+                REQUEST_STATS.reset(token)
+
+
+def install_query_log(app: FastAPI):
+    if not LOGGER.handlers:
+        LOGGER.addHandler(logging.StreamHandler())
+        LOGGER.setLevel(logging.INFO)
+    app.add_middleware(QueryLogMiddleware)
@@ -1,9 +1,8 @@
 # API
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
-# pagination
-from fastapi_pagination import Page
-from fastapi_pagination.ext.async_sqlalchemy import paginate
+# streaming response
+from fastapi.responses import StreamingResponse
 
 # get sqlalchemy functions
 from sqlalchemy import select
@@ -14,45 +13,194 @@
 # get sqlalchemy loading strategy
 from sqlalchemy.orm import selectinload
 
+# bulk writes
+from ..bulk import (
+    Rows,
+    Written,
+    bulk_openapi,
+    bulk_write,
+    check_ids,
+    insert_rows,
+    update_rows,
+)
+
+# response cache
+from ..cache import Cache, cache_key, changed_keys, embed_tag
+
 # database models and schemas
 from ..db import models, schemas
 
 # author filter
 from ..db.filters import AuthorFilter, BookFilter
 
+# row versions
+from ..db.versions import bump_authors, get_version
+
 # other dependencies
 from ..dependencies import (
     CustomFilterDepends,
+    check_parent,
+    get_cache,
+    get_loader,
     get_session,
     raise_404,
     response_404,
 )
 
+# conditional requests
+from ..etag import entity_etag, not_modified
+
+# streaming export
+from ..export import ExportFormat, export_response, response_export
+
+# sparse fieldsets
+from ..fields import FieldsDepends, Fieldset, select_fields
+
+# batching relationship loader
+from ..loaders import AUTHOR_BOOKS, BOOK_PUBLISHER, Loader
+
+# pagination
+from ..pagination import (
+    CursorPage,
+    Page,
+    ordering_names,
+    paginate_keyset,
+    paginate_offset,
+)
+
+# collection previews
+from ..previews import collection_previews
+
+# query budgets
+from ..queries import query_budget
+
+# app routes
+from ..routing import LibraryRoute
+
 router = APIRouter(
     prefix="/authors",
     tags=["Author"],
+    route_class=LibraryRoute,
     dependencies=[Depends(get_session)],
 )
 
+# statement templates
+SELECT_AUTHORS = select(models.Author).options(
+    selectinload(models.Author.books)
+)
+
+
+# relations of list items with response fields they add
+AUTHOR_RELATIONS = {"books": ("books", "books_count")}
+
+
+# select requested author fields; books are previewed unless expanded, so
+# that page cost does not depend on the largest author
+def select_authors(session: AsyncSession, fieldset: Fieldset, *keys: str):
+    query = select_fields(models.Author, fieldset, *keys)
+    if not fieldset.includes("books"):
+        return query, None
+    if expanded := fieldset.expands("books"):
+        query = query.options(selectinload(models.Author.books))
+    return (
+        query,
+        collection_previews(
+            session,
+            "books",
+            models.Book,
+            models.AuthorBookAssociation.author_id,
+            expanded,
+            join=models.AuthorBookAssociation,
+        ),
+    )
+
 
 @router.get(
     "/",
-    response_model=Page[schemas.Author_Books],
+    response_model=Page[schemas.Author_BooksPreview],
 )
 async def read_authors(
     _filter: AuthorFilter = CustomFilterDepends(AuthorFilter),
+    fieldset: Fieldset = FieldsDepends(
+        schemas.Author_BooksPreview, AUTHOR_RELATIONS
+    ),
+    session: AsyncSession = Depends(get_session),
+):
+    query, transform = select_authors(session, fieldset)
+    with fieldset.page(Page):
+        page = await paginate_offset(
+            session,
+            _filter.sort(_filter.filter(query)),
+            transform=transform,
+        )
+    return fieldset.response(page)
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPage[schemas.Author_BooksPreview],
+)
+async def read_authors_cursor(
+    _filter: AuthorFilter = CustomFilterDepends(AuthorFilter),
+    fieldset: Fieldset = FieldsDepends(
+        schemas.Author_BooksPreview, AUTHOR_RELATIONS
+    ),
     session: AsyncSession = Depends(get_session),
 ):
-    return await paginate(
+    query, transform = select_authors(
+        session, fieldset, *ordering_names(_filter.original())
+    )
+    with fieldset.page(CursorPage):
+        page = await paginate_keyset(
+            session,
+            _filter.filter(query),
+            _filter.original(),
+            transform=transform,
+        )
+    return fieldset.response(page)
+
+
+# authors with books and their publishers: every level is batched by the
+# loader, so a page costs the same queries however many rows it holds
+@router.get(
+    "/nested",
+    response_model=Page[schemas.Author_Books_Publisher],
+)
+@query_budget(6)
+async def read_authors_nested(
+    _filter: AuthorFilter = CustomFilterDepends(AuthorFilter),
+    session: AsyncSession = Depends(get_session),
+    loader: Loader = Depends(get_loader),
+):
+    return await paginate_offset(
         session,
-        _filter.sort(
-            _filter.filter(
-                select(models.Author).options(selectinload(models.Author.books))
-            )
+        _filter.sort(_filter.filter(select(models.Author))),
+        transform=loader.transform(
+            models.Author,
+            {"books": (AUTHOR_BOOKS, {"publisher": BOOK_PUBLISHER})},
         ),
     )
 
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses=response_export,
+)
+async def export_authors(
+    format: ExportFormat = ExportFormat.ndjson,
+    _filter: AuthorFilter = CustomFilterDepends(AuthorFilter),
+    session: AsyncSession = Depends(get_session),
+):
+    return export_response(
+        session,
+        _filter.sort(_filter.filter(SELECT_AUTHORS)),
+        schemas.Author_Books,
+        format,
+        "authors",
+    )
+
+
 @router.get(
     "/{author_id}",
     response_model=schemas.Author_Books,
@@ -60,19 +208,37 @@ async def read_authors(
 )
 async def read_author(
     author_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
-    if not (
-        author := (
-            await session.get(
-                models.Author,
-                author_id,
-                [selectinload(models.Author.books)],
+    if not (version := await get_version(session, models.Author, author_id)):
+        await raise_404("author")
+    if response := not_modified(
+        request, etag := entity_etag("author", author_id, version)
+    ):
+        return response
+    if not (response := await cache.fetch(etag)):
+        if not (
+            author := (
+                await session.get(
+                    models.Author,
+                    author_id,
+                    [selectinload(models.Author.books)],
+                )
             )
+        ):
+            await raise_404("author")
+        response = await cache.store(
+            etag,
+            schemas.Author_Books.from_orm(author),
+            [
+                cache_key("author", author_id),
+                *(embed_tag("book", book.id) for book in author.books),
+            ],
         )
-    ):
-        await raise_404("author")
-    return author
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.post(
@@ -89,6 +255,49 @@ async def create_author(
     return new_author
 
 
+# create new and update existing authors
+async def write_authors(session: AsyncSession, valid: Rows) -> Written:
+    inserts = [(index, author) for index, author in valid if not author.id]
+    updates = [(index, author) for index, author in valid if author.id]
+    ids = await insert_rows(
+        session,
+        models.Author,
+        [author.dict(exclude={"id"}) for _, author in inserts],
+    )
+    if updates:
+        await update_rows(
+            session, models.Author, [author.dict() for _, author in updates]
+        )
+        await bump_authors(session, {author.id for _, author in updates})
+    return [
+        *((index, id, True) for (index, _), id in zip(inserts, ids)),
+        *((index, author.id, False) for index, author in updates),
+    ], changed_keys("author", (author.id for _, author in updates))
+
+
+@router.post(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    openapi_extra=bulk_openapi(schemas.AuthorBulk),
+)
+@query_budget(None)
+async def create_authors_bulk(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
+):
+    return await bulk_write(
+        request,
+        session,
+        cache,
+        schemas.AuthorBulk,
+        lambda session, valid, result: check_ids(
+            session, models.Author, "author", valid, result
+        ),
+        write_authors,
+    )
+
+
 @router.put(
     "/{author_id}",
     response_model=schemas.Author,
@@ -98,6 +307,7 @@ async def update_author(
     author_id: int,
     author: schemas.AuthorCreate = Depends(),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
         updated_author := await session.get(
@@ -109,7 +319,9 @@ async def update_author(
         await raise_404("author")
     for key, value in author:
         setattr(updated_author, key, value)
+    await bump_authors(session, {author_id})
     await session.commit()
+    await cache.invalidate(*changed_keys("author", [author_id]))
     return updated_author
 
 
@@ -122,6 +334,7 @@ async def patch_author(
     author_id: int,
     author: schemas.AuthorPatch = Depends(),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
         patched_author := await session.get(
@@ -133,7 +346,9 @@ async def patch_author(
         await raise_404("author")
     for key, value in author.dict(exclude_none=True).items():
         setattr(patched_author, key, value)
+    await bump_authors(session, {author_id})
     await session.commit()
+    await cache.invalidate(*changed_keys("author", [author_id]))
     return patched_author
 
 
@@ -145,6 +360,7 @@ async def patch_author(
 async def delete_author(
     author_id: int,
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
         deleted_author := await session.get(
@@ -155,8 +371,10 @@ async def delete_author(
         )
     ):
         await raise_404("author")
+    await bump_authors(session, {author_id})
     await session.delete(deleted_author)
     await session.commit()
+    await cache.invalidate(*changed_keys("author", [author_id]))
     return deleted_author
 
 
@@ -169,16 +387,20 @@ async def read_author_books(
     author_id: int,
     _filter: BookFilter = CustomFilterDepends(BookFilter),
     session: AsyncSession = Depends(get_session),
+    loader: Loader = Depends(get_loader),
 ):
-    if not (author := (await session.get(models.Author, author_id))):
-        await raise_404("author")
-    return await paginate(
+    page = await paginate_offset(
         session,
         _filter.sort(
             _filter.filter(
                 select(models.Book)
-                .where(models.Book.authors.contains(author))
-                .options(selectinload(models.Book.publisher))
+                .join(
+                    models.AuthorBookAssociation,
+                    models.AuthorBookAssociation.book_id == models.Book.id,
+                )
+                .where(models.AuthorBookAssociation.author_id == author_id)
             )
         ),
+        transform=loader.transform(models.Book, {"publisher": BOOK_PUBLISHER}),
     )
+    return await check_parent(session, page, models.Author, author_id, "author")
@@ -1,20 +1,39 @@
-from typing import Optional
+from functools import partial
+from types import SimpleNamespace
+from typing import Optional, Sequence
 
 # API
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Request
 
-# pagination
-from fastapi_pagination import Page
-from fastapi_pagination.ext.async_sqlalchemy import paginate
+# streaming response
+from fastapi.responses import StreamingResponse
 
 # get sqlalchemy functions
-from sqlalchemy import select
+from sqlalchemy import delete, insert, literal, select
 
 # get sqlalchemy async session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # get sqlalchemy loading strategy
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
+
+# bulk writes
+from ..bulk import (
+    Rows,
+    Written,
+    bulk_openapi,
+    bulk_write,
+    error,
+    existing_ids,
+    fail,
+    insert_rows,
+    update_rows,
+    validate_rows,
+    write_batch,
+)
+
+# response cache
+from ..cache import Cache, cache_key, changed_keys, embed_tag
 
 # database models and schemas
 from ..db import models, schemas
@@ -22,28 +41,183 @@
 # book filter
 from ..db.filters import AuthorFilter, BookFilter
 
+# row versions
+from ..db.versions import (
+    bump_book_relations,
+    bump_books_relations,
+    bump_versions,
+    get_version,
+)
+
 # other dependencies
 from ..dependencies import (
     CustomFilterDepends,
+    check_parent,
+    get_cache,
     get_session,
     raise_404,
     raise_404_list,
     response_404,
 )
 
+# conditional requests
+from ..etag import entity_etag, not_modified
+
+# streaming export
+from ..export import ExportFormat, export_response, response_export
+
+# sparse fieldsets
+from ..fields import FieldsDepends, Fieldset, select_fields
+
+# write-behind queue
+from ..jobs import Write, create_queue, finish, respond_async, response_202
+
+# pagination
+from ..pagination import (
+    CursorPage,
+    Page,
+    Transform,
+    ordering_names,
+    paginate_keyset,
+    paginate_offset,
+)
+
+# query budgets
+from ..queries import query_budget
+
+# app routes
+from ..routing import LibraryRoute
+
+# app settings
+from ..settings import settings
+
 router = APIRouter(
     prefix="/books",
     tags=["Book"],
+    route_class=LibraryRoute,
     dependencies=[Depends(get_session)],
 )
 
+# statement templates
+SELECT_BOOKS = select(models.Book).options(
+    selectinload(models.Book.authors),
+    selectinload(models.Book.publisher),
+)
+
+# relations of list items with response fields they add
+BOOK_RELATIONS = {"authors": ("authors",), "publisher": ("publisher",)}
+BOOK_LOADERS = {
+    "authors": selectinload(models.Book.authors),
+    "publisher": selectinload(models.Book.publisher),
+}
+
+
+# book with authors and publisher read from its summary
+class SummarizedBook:
+    def __init__(self, book: models.Book):
+        self.book, summary = book, book.summary
+        self.authors = [SimpleNamespace(**author) for author in summary.authors]
+        self.publisher = (
+            SimpleNamespace(**summary.publisher) if summary.publisher else None
+        )
+
+    def __getattr__(self, name: str):
+        return getattr(self.book, name)
+
+
+async def summarize_books(
+    books: Sequence[models.Book],
+) -> list[SummarizedBook]:
+    return [SummarizedBook(book) for book in books]
+
+
+# relations are read from book summaries joined by primary key, see book
+# summaries setting
+def summarized(fieldset: Fieldset) -> bool:
+    return settings.book_summaries_enabled and bool(fieldset.relations)
+
+
+# select requested book fields and relations
+def select_books(fieldset: Fieldset, *keys: str):
+    query = select_fields(models.Book, fieldset, *keys)
+    if summarized(fieldset):
+        return query.options(joinedload(models.Book.summary))
+    return query.options(
+        *(BOOK_LOADERS[relation] for relation in fieldset.relations)
+    )
+
+
+def books_transform(fieldset: Fieldset) -> Optional[Transform]:
+    return summarize_books if summarized(fieldset) else None
+
+
+# lock book for writing, loading its authors and publisher in one query
+async def lock_book(session: AsyncSession, book_id: int) -> models.Book:
+    if not (
+        book := (
+            await session.scalars(
+                select(models.Book)
+                .options(
+                    joinedload(models.Book.authors),
+                    joinedload(models.Book.publisher),
+                )
+                .where(models.Book.id == book_id)
+                .with_for_update(of=models.Book)
+            )
+        )
+        .unique()
+        .one_or_none()
+    ):
+        await raise_404("book")
+    return book
+
 
-async def check_authors(session: AsyncSession, author_ids: list[int]):
-    return (
-        await session.scalars(
-            select(models.Author).where(models.Author.id.in_(author_ids))
+# get publisher and authors referenced by book in one query, raise 404 when
+# any is missing; references not given are not checked
+async def check_references(
+    session: AsyncSession,
+    publisher_id: Optional[int],
+    author_ids: Optional[list[int]],
+) -> tuple[Optional[models.Publisher], list[models.Author]]:
+    if publisher_id is None and not author_ids:
+        return None, []
+    if publisher_id is None:
+        query = select(literal(None), models.Author).where(
+            models.Author.id.in_(author_ids)
+        )
+    elif not author_ids:
+        query = select(models.Publisher, literal(None))
+    else:
+        query = select(models.Publisher, models.Author).outerjoin(
+            models.Author, models.Author.id.in_(author_ids)
+        )
+    if publisher_id is not None:
+        query = query.where(models.Publisher.id == publisher_id)
+    if not (rows := (await session.execute(query)).all()) and publisher_id:
+        await raise_404("publisher")
+    authors = [author for _, author in rows if author is not None]
+    if author_ids and len(authors) != len(author_ids):
+        await raise_404_list(
+            "author",
+            set(author_ids) - set(a.id for a in authors),
         )
-    ).all()
+    return rows[0][0] if rows else None, authors
+
+
+# entities embedded into book response
+def book_tags(book: models.Book) -> list[str]:
+    return [
+        embed_tag("publisher", book.publisher_id),
+        *(embed_tag("author", author.id) for author in book.authors),
+    ]
+
+
+# publisher and authors whose responses list the book
+def relation_keys(book: models.Book) -> list[str]:
+    return [
+        cache_key("publisher", book.publisher_id),
+        *(cache_key("author", author.id) for author in book.authors),
+    ]
 
 
 @router.get(
@@ -52,18 +226,55 @@ async def check_authors(session: AsyncSession, author_ids: list[int]):
 )
 async def read_books(
     _filter: BookFilter = CustomFilterDepends(BookFilter),
+    fieldset: Fieldset = FieldsDepends(schemas.Book_All, BOOK_RELATIONS),
     session: AsyncSession = Depends(get_session),
 ):
-    return await paginate(
-        session,
-        _filter.sort(
+    with fieldset.page(Page):
+        page = await paginate_offset(
+            session,
+            _filter.sort(_filter.filter(select_books(fieldset))),
+            transform=books_transform(fieldset),
+        )
+    return fieldset.response(page)
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPage[schemas.Book_All],
+)
+async def read_books_cursor(
+    _filter: BookFilter = CustomFilterDepends(BookFilter),
+    fieldset: Fieldset = FieldsDepends(schemas.Book_All, BOOK_RELATIONS),
+    session: AsyncSession = Depends(get_session),
+):
+    with fieldset.page(CursorPage):
+        page = await paginate_keyset(
+            session,
             _filter.filter(
-                select(models.Book).options(
-                    selectinload(models.Book.authors),
-                    selectinload(models.Book.publisher),
-                )
-            )
-        ),
+                select_books(fieldset, *ordering_names(_filter.original()))
+            ),
+            _filter.original(),
+            transform=books_transform(fieldset),
+        )
+    return fieldset.response(page)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses=response_export,
+)
+async def export_books(
+    format: ExportFormat = ExportFormat.ndjson,
+    _filter: BookFilter = CustomFilterDepends(BookFilter),
+    session: AsyncSession = Depends(get_session),
+):
+    return export_response(
+        session,
+        _filter.sort(_filter.filter(SELECT_BOOKS)),
+        schemas.Book_All,
+        format,
+        "books",
     )
 
 
@@ -74,29 +285,49 @@ async def read_books(
 )
 async def read_book(
     book_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
-    if not (
-        book := (
-            await session.get(
-                models.Book,
-                book_id,
-                [
-                    selectinload(models.Book.authors),
-                    selectinload(models.Book.publisher),
-                ],
+    if not (version := await get_version(session, models.Book, book_id)):
+        await raise_404("book")
+    if response := not_modified(
+        request, etag := entity_etag("book", book_id, version)
+    ):
+        return response
+    if not (response := await cache.fetch(etag)):
+        if not (
+            book := (
+                await session.get(
+                    models.Book,
+                    book_id,
+                    [joinedload(models.Book.summary)]
+                    if settings.book_summaries_enabled
+                    else [
+                        selectinload(models.Book.authors),
+                        selectinload(models.Book.publisher),
+                    ],
+                )
             )
+        ):
+            await raise_404("book")
+        if settings.book_summaries_enabled:
+            book = SummarizedBook(book)
+        response = await cache.store(
+            etag,
+            schemas.Book_All.from_orm(book),
+            [cache_key("book", book_id), *book_tags(book)],
         )
-    ):
-        await raise_404("book")
-    return book
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.post(
     "/",
     response_model=schemas.Book_All,
-    responses=response_404,
+    responses=response_404 | response_202,
 )
+@query_budget(5)
 async def create_book(
     book: schemas.BookCreate = Depends(),
     publisher_id: int = Query(title="publisher_id"),
@@ -106,33 +337,233 @@ async def create_book(
         unique_items=True,
         gt=0,
     ),
+    prefer: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
-    if not (publisher := await session.get(models.Publisher, publisher_id)):
-        await raise_404("publisher")
-    if len(author_ids) == len(
-        authors := await check_authors(session, author_ids)
-    ):
-        session.add(
-            new_book := models.Book(
+    if respond_async(prefer):
+        return await BOOK_QUEUE.submit(
+            None,
+            {
                 **book.dict(),
-                publisher=publisher,
-                authors=authors,
+                "publisher_id": publisher_id,
+                "author_ids": author_ids,
+            },
+        )
+    publisher, authors = await check_references(
+        session, publisher_id, author_ids
+    )
+    session.add(
+        new_book := models.Book(
+            **book.dict(),
+            publisher=publisher,
+            authors=authors,
+        )
+    )
+    await bump_book_relations(session, set(author_ids), {publisher_id})
+    await session.commit()
+    await cache.invalidate(*relation_keys(new_book))
+    return new_book
+
+
+# report rows referencing missing publishers, authors or books
+async def check_books(
+    session: AsyncSession,
+    valid: Rows,
+    result: schemas.BulkResult,
+) -> Rows:
+    found = await existing_ids(
+        session,
+        publisher=(models.Publisher, {book.publisher_id for _, book in valid}),
+        author=(
+            models.Author,
+            {author_id for _, book in valid for author_id in book.author_ids},
+        ),
+        book=(models.Book, {book.id for _, book in valid if book.id}),
+    )
+    checked = []
+    for index, book in valid:
+        errors = []
+        if book.id and book.id not in found["book"]:
+            errors.append(error(["id"], "No such book.", "not_found.book"))
+        if book.publisher_id not in found["publisher"]:
+            errors.append(
+                error(
+                    ["publisher_id"],
+                    "No such publisher.",
+                    "not_found.publisher",
+                )
+            )
+        if missing := set(book.author_ids) - found["author"]:
+            errors.append(
+                error(
+                    ["author_ids"],
+                    f"No such author: {sorted(missing)}.",
+                    "not_found.author",
+                )
+            )
+        if errors:
+            fail(result, index, errors)
+        else:
+            checked.append((index, book))
+    return checked
+
+
+# create new and update existing books with their authors, authors of
+# updated books in kept_authors are left as they are
+async def write_books(
+    session: AsyncSession,
+    valid: Rows,
+    kept_authors: frozenset[int] = frozenset(),
+) -> Written:
+    inserts = [(index, book) for index, book in valid if not book.id]
+    updates = [(index, book) for index, book in valid if book.id]
+    ids = await insert_rows(
+        session,
+        models.Book,
+        [book.dict(exclude={"id", "author_ids"}) for _, book in inserts],
+    )
+    if updates:
+        update_ids = {book.id for _, book in updates}
+        # previous relations are bumped before they are replaced
+        await bump_books_relations(session, update_ids)
+        await bump_versions(
+            session, models.Book, models.Book.id.in_(update_ids)
+        )
+        await update_rows(
+            session,
+            models.Book,
+            [book.dict(exclude={"author_ids"}) for _, book in updates],
+        )
+        if replaced := update_ids - kept_authors:
+            await session.execute(
+                delete(models.AuthorBookAssociation).where(
+                    models.AuthorBookAssociation.book_id.in_(replaced)
+                )
             )
+    books = [
+        *((index, id, book) for (index, book), id in zip(inserts, ids)),
+        *((index, book.id, book) for index, book in updates),
+    ]
+    if associations := [
+        {"book_id": id, "author_id": author_id}
+        for _, id, book in books
+        if id not in kept_authors
+        for author_id in book.author_ids
+    ]:
+        await session.execute(
+            insert(models.AuthorBookAssociation), associations
         )
-        await session.commit()
-        return new_book
-    await raise_404_list(
-        "author",
-        set(author_ids) - set(a.id for a in authors),
+    author_ids = {a for _, _, book in books for a in book.author_ids}
+    publisher_ids = {book.publisher_id for _, _, book in books}
+    await bump_book_relations(session, author_ids, publisher_ids)
+    return [(index, id, not book.id) for index, id, book in books], [
+        *changed_keys("book", (book.id for _, book in updates)),
+        *(cache_key("author", author_id) for author_id in author_ids),
+        *(cache_key("publisher", id) for id in publisher_ids),
+    ]
+
+
+@router.post(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    openapi_extra=bulk_openapi(schemas.BookBulk),
+)
+@query_budget(None)
+async def create_books_bulk(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
+):
+    return await bulk_write(
+        request,
+        session,
+        cache,
+        schemas.BookBulk,
+        check_books,
+        write_books,
     )
 
 
+# write queued creates and patches of books as one bulk batch, patches of
+# the same book are merged in order into one update; patched books are
+# locked until the batch commits, so that synchronous writes in between are
+# not overwritten, and their authors are only replaced when patched
+async def write_book_jobs(
+    session: AsyncSession, cache: Cache, writes: list[Write]
+):
+    books = {
+        book.id: book
+        for book in await session.scalars(
+            select(models.Book)
+            .options(selectinload(models.Book.authors))
+            .where(models.Book.id.in_({w.id for w in writes if w.id}))
+            .order_by(models.Book.id)
+            .with_for_update(of=models.Book)
+        )
+    }
+    rows: list[tuple[dict, list[Write]]] = []
+    patched: dict[int, int] = {}
+    authors_patched: set[int] = set()
+    for write in writes:
+        if write.id is None:
+            rows.append((write.data, [write]))
+            continue
+        if write.id not in patched:
+            if not (book := books.get(write.id)):
+                finish(
+                    write.job,
+                    None,
+                    [error(["id"], "No such book.", "not_found.book")],
+                )
+                continue
+            patched[write.id] = len(rows)
+            rows.append(
+                (
+                    schemas.Book.from_orm(book).dict()
+                    | {
+                        "publisher_id": book.publisher_id,
+                        "author_ids": [a.id for a in book.authors],
+                    },
+                    [],
+                )
+            )
+        data, merged = rows[patched[write.id]]
+        data.update(write.data)
+        merged.append(write)
+        if "author_ids" in write.data:
+            authors_patched.add(write.id)
+    result = schemas.BulkResult()
+    if valid := await check_books(
+        session,
+        validate_rows(schemas.BookBulk, [data for data, _ in rows], 0, result),
+        result,
+    ):
+        await write_batch(
+            session,
+            cache,
+            valid,
+            partial(
+                write_books,
+                kept_authors=frozenset(patched.keys() - authors_patched),
+            ),
+            result,
+        )
+    errors = {e.index: e.detail for e in result.errors}
+    for index, (_, merged) in enumerate(rows):
+        for write in merged:
+            finish(write.job, result.ids[index], errors.get(index))
+
+
+BOOK_QUEUE = create_queue(write_book_jobs)
+
+
 @router.put(
     "/{book_id}",
     response_model=schemas.Book_All,
     responses=response_404,
 )
+@query_budget(7)
 async def update_book(
     book_id: int,
     book: schemas.BookCreate = Depends(),
@@ -144,40 +575,36 @@ async def update_book(
         gt=0,
     ),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
-    if not (
-        updated_book := await session.get(
-            models.Book,
-            book_id,
-            [
-                selectinload(models.Book.authors),
-                selectinload(models.Book.publisher),
-            ],
-            with_for_update=True,
-        )
-    ):
-        await raise_404("book")
-    if not (publisher := await session.get(models.Publisher, publisher_id)):
-        await raise_404("publisher")
-    if len(author_ids) == len(
-        authors := await check_authors(session, author_ids)
-    ):
-        for key, value in book:
-            setattr(updated_book, key, value)
-        updated_book.publisher, updated_book.authors = publisher, authors
-        await session.commit()
-        return updated_book
-    await raise_404_list(
-        "author",
-        set(author_ids) - set(a.id for a in authors),
+    updated_book = await lock_book(session, book_id)
+    publisher, authors = await check_references(
+        session, publisher_id, author_ids
+    )
+    await bump_book_relations(
+        session,
+        {a.id for a in updated_book.authors} | set(author_ids),
+        {updated_book.publisher_id, publisher_id},
     )
+    for key, value in book:
+        setattr(updated_book, key, value)
+    # collection change only writes association rows of changed authors
+    updated_book.publisher, updated_book.authors = publisher, authors
+    updated_book.version = models.Book.version + 1
+    await session.commit()
+    # previous publisher and authors embed the book, new ones list it now
+    await cache.invalidate(
+        *changed_keys("book", [book_id]), *relation_keys(updated_book)
+    )
+    return updated_book
 
 
 @router.patch(
     "/{book_id}",
     response_model=schemas.Book_All,
-    responses=response_404,
+    responses=response_404 | response_202,
 )
+@query_budget(7)
 async def patch_book(
     book_id: int,
     book: schemas.BookPatch = Depends(),
@@ -189,38 +616,41 @@ async def patch_book(
         unique_items=True,
         gt=0,
     ),
+    prefer: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
-    if not (
-        patched_book := await session.get(
-            models.Book,
+    if respond_async(prefer):
+        return await BOOK_QUEUE.submit(
             book_id,
-            [
-                selectinload(models.Book.authors),
-                selectinload(models.Book.publisher),
-            ],
-            with_for_update=True,
+            {
+                **book.dict(exclude_none=True),
+                **({"publisher_id": publisher_id} if publisher_id else {}),
+                **({"author_ids": author_ids} if author_ids else {}),
+            },
         )
-    ):
-        await raise_404("book")
-    if publisher_id:
-        if publisher := await session.get(models.Publisher, publisher_id):
-            patched_book.publisher = publisher
-        else:
-            await raise_404("publisher")
+    patched_book = await lock_book(session, book_id)
+    publisher, authors = await check_references(
+        session, publisher_id or None, author_ids
+    )
+    # previous and new relations are bumped
+    await bump_book_relations(
+        session,
+        {a.id for a in patched_book.authors} | set(author_ids or ()),
+        {patched_book.publisher_id, publisher_id or None},
+    )
+    if publisher:
+        patched_book.publisher = publisher
     if author_ids:
-        if len(author_ids) == len(
-            authors := await check_authors(session, author_ids)
-        ):
-            patched_book.authors = authors
-        else:
-            await raise_404_list(
-                "author",
-                set(author_ids) - set(a.id for a in authors),
-            )
-    for key, value in book.dict(exclude_none=True):
+        patched_book.authors = authors
+    for key, value in book.dict(exclude_none=True).items():
         setattr(patched_book, key, value)
+    patched_book.version = models.Book.version + 1
     await session.commit()
+    # previous publisher and authors embed the book, new ones list it now
+    await cache.invalidate(
+        *changed_keys("book", [book_id]), *relation_keys(patched_book)
+    )
     return patched_book
 
 
@@ -229,24 +659,21 @@ async def patch_book(
     response_model=schemas.Book_All,
     responses=response_404,
 )
+@query_budget(5)
 async def delete_book(
     book_id: int,
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
-    if not (
-        deleted_book := await session.get(
-            models.Book,
-            book_id,
-            [
-                selectinload(models.Book.authors),
-                selectinload(models.Book.publisher),
-            ],
-            with_for_update=True,
-        )
-    ):
-        await raise_404("book")
+    deleted_book = await lock_book(session, book_id)
+    await bump_book_relations(
+        session,
+        {a.id for a in deleted_book.authors},
+        {deleted_book.publisher_id},
+    )
     await session.delete(deleted_book)
     await session.commit()
+    await cache.invalidate(*changed_keys("book", [book_id]))
     return deleted_book
 
 
@@ -260,13 +687,17 @@ async def read_author_books(
     _filter: AuthorFilter = CustomFilterDepends(AuthorFilter),
     session: AsyncSession = Depends(get_session),
 ):
-    if not (book := (await session.get(models.Book, book_id))):
-        await raise_404("book")
-    return await paginate(
+    page = await paginate_offset(
         session,
         _filter.sort(
             _filter.filter(
-                select(models.Author).where(models.Author.books.contains(book))
+                select(models.Author)
+                .join(
+                    models.AuthorBookAssociation,
+                    models.AuthorBookAssociation.author_id == models.Author.id,
+                )
+                .where(models.AuthorBookAssociation.book_id == book_id)
             )
         ),
     )
+    return await check_parent(session, page, models.Book, book_id, "book")
@@ -0,0 +1,31 @@
+# API
+from fastapi import APIRouter
+
+# database schemas
+from ..db import schemas
+
+# other dependencies
+from ..dependencies import raise_404, response_404
+
+# write-behind queue
+from ..jobs import get_job
+
+# app routes
+from ..routing import LibraryRoute
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Job"],
+    route_class=LibraryRoute,
+)
+
+
+@router.get(
+    "/{job_id}",
+    response_model=schemas.Job,
+    responses=response_404,
+)
+async def read_job(job_id: str):
+    if not (job := await get_job(job_id)):
+        await raise_404("job")
+    return job
@@ -0,0 +1,59 @@
+# API and http status
+from fastapi import APIRouter, status
+
+# exceptions
+from fastapi.exceptions import HTTPException
+
+# text response
+from fastapi.responses import PlainTextResponse
+
+# database schemas
+from ..db import schemas
+
+# database
+from ..db.database import DATABASE
+
+# pool instrumentation
+from ..db.pool import POOL_METRICS
+
+# request metrics
+from ..metrics import REGISTRY
+
+# app routes
+from ..routing import LibraryRoute
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    route_class=LibraryRoute,
+)
+
+
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+)
+async def read_metrics():
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@router.get(
+    "/pool",
+    response_model=schemas.PoolMetrics,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.Message}},
+)
+async def read_pool_metrics():
+    # engine is created on startup and dropped on shutdown
+    if DATABASE.engine is None:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=[
+                {
+                    "msg": "Database is not connected.",
+                    "type": "not_connected",
+                }
+            ],
+        )
+    return POOL_METRICS.snapshot(DATABASE.engine.sync_engine.pool)
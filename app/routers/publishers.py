@@ -1,9 +1,8 @@
 # API
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
-# pagination
-from fastapi_pagination import Page
-from fastapi_pagination.ext.async_sqlalchemy import paginate
+# streaming response
+from fastapi.responses import StreamingResponse
 
 # get sqlalchemy functions
 from sqlalchemy import select
@@ -14,47 +13,193 @@
 # get sqlalchemy loading strategy
 from sqlalchemy.orm import selectinload
 
+# bulk writes
+from ..bulk import (
+    Rows,
+    Written,
+    bulk_openapi,
+    bulk_write,
+    check_ids,
+    insert_rows,
+    update_rows,
+)
+
+# response cache
+from ..cache import Cache, cache_key, changed_keys, embed_tag
+
 # database models and schemas
 from ..db import models, schemas
 
 # publisher filter
 from ..db.filters import BookFilter, PublisherFilter
 
+# row versions
+from ..db.versions import bump_publishers, get_version
+
 # other dependencies
 from ..dependencies import (
     CustomFilterDepends,
+    check_parent,
+    get_cache,
+    get_loader,
     get_session,
     raise_404,
     response_404,
 )
 
+# conditional requests
+from ..etag import entity_etag, not_modified
+
+# streaming export
+from ..export import ExportFormat, export_response, response_export
+
+# sparse fieldsets
+from ..fields import FieldsDepends, Fieldset, select_fields
+
+# batching relationship loader
+from ..loaders import BOOK_AUTHORS, PUBLISHER_BOOKS, Loader
+
+# pagination
+from ..pagination import (
+    CursorPage,
+    Page,
+    ordering_names,
+    paginate_keyset,
+    paginate_offset,
+)
+
+# collection previews
+from ..previews import collection_previews
+
+# query budgets
+from ..queries import query_budget
+
+# app routes
+from ..routing import LibraryRoute
+
 router = APIRouter(
     prefix="/publishers",
     tags=["Publisher"],
+    route_class=LibraryRoute,
     dependencies=[Depends(get_session)],
 )
 
+# statement templates
+SELECT_PUBLISHERS = select(models.Publisher).options(
+    selectinload(models.Publisher.books)
+)
+
+
+# relations of list items with response fields they add
+PUBLISHER_RELATIONS = {"books": ("books", "books_count")}
+
+
+# select requested publisher fields; books are previewed unless expanded, so that
+# page cost does not depend on the largest publisher
+def select_publishers(session: AsyncSession, fieldset: Fieldset, *keys: str):
+    query = select_fields(models.Publisher, fieldset, *keys)
+    if not fieldset.includes("books"):
+        return query, None
+    if expanded := fieldset.expands("books"):
+        query = query.options(selectinload(models.Publisher.books))
+    return (
+        query,
+        collection_previews(
+            session,
+            "books",
+            models.Book,
+            models.Book.publisher_id,
+            expanded,
+        ),
+    )
+
 
 @router.get(
     "/",
-    response_model=Page[schemas.Publisher_Books],
+    response_model=Page[schemas.Publisher_BooksPreview],
 )
 async def read_publishers(
+    _filter: PublisherFilter = CustomFilterDepends(PublisherFilter),
+    fieldset: Fieldset = FieldsDepends(
+        schemas.Publisher_BooksPreview, PUBLISHER_RELATIONS
+    ),
+    session: AsyncSession = Depends(get_session),
+):
+    query, transform = select_publishers(session, fieldset)
+    with fieldset.page(Page):
+        page = await paginate_offset(
+            session,
+            _filter.sort(_filter.filter(query)),
+            transform=transform,
+        )
+    return fieldset.response(page)
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPage[schemas.Publisher_BooksPreview],
+)
+async def read_publishers_cursor(
+    _filter: PublisherFilter = CustomFilterDepends(PublisherFilter),
+    fieldset: Fieldset = FieldsDepends(
+        schemas.Publisher_BooksPreview, PUBLISHER_RELATIONS
+    ),
+    session: AsyncSession = Depends(get_session),
+):
+    query, transform = select_publishers(
+        session, fieldset, *ordering_names(_filter.original())
+    )
+    with fieldset.page(CursorPage):
+        page = await paginate_keyset(
+            session,
+            _filter.filter(query),
+            _filter.original(),
+            transform=transform,
+        )
+    return fieldset.response(page)
+
+
+# publishers with books and their authors: every level is batched by the
+# loader, so a page costs the same queries however many rows it holds
+@router.get(
+    "/nested",
+    response_model=Page[schemas.Publisher_Books_Authors],
+)
+@query_budget(6)
+async def read_publishers_nested(
     _filter: PublisherFilter = CustomFilterDepends(PublisherFilter),
     session: AsyncSession = Depends(get_session),
+    loader: Loader = Depends(get_loader),
 ):
-    return await paginate(
+    return await paginate_offset(
         session,
-        _filter.sort(
-            _filter.filter(
-                select(models.Publisher).options(
-                    selectinload(models.Publisher.books)
-                )
-            )
+        _filter.sort(_filter.filter(select(models.Publisher))),
+        transform=loader.transform(
+            models.Publisher,
+            {"books": (PUBLISHER_BOOKS, {"authors": BOOK_AUTHORS})},
         ),
     )
 
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses=response_export,
+)
+async def export_publishers(
+    format: ExportFormat = ExportFormat.ndjson,
+    _filter: PublisherFilter = CustomFilterDepends(PublisherFilter),
+    session: AsyncSession = Depends(get_session),
+):
+    return export_response(
+        session,
+        _filter.sort(_filter.filter(SELECT_PUBLISHERS)),
+        schemas.Publisher_Books,
+        format,
+        "publishers",
+    )
+
+
 @router.get(
     "/{publisher_id}",
     response_model=schemas.Publisher_Books,
@@ -62,19 +207,39 @@ async def read_publishers(
 )
 async def read_publisher(
     publisher_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
-        publisher := (
-            await session.get(
-                models.Publisher,
-                publisher_id,
-                [selectinload(models.Publisher.books)],
-            )
-        )
+        version := await get_version(session, models.Publisher, publisher_id)
     ):
         await raise_404("publisher")
-    return publisher
+    if response := not_modified(
+        request, etag := entity_etag("publisher", publisher_id, version)
+    ):
+        return response
+    if not (response := await cache.fetch(etag)):
+        if not (
+            publisher := (
+                await session.get(
+                    models.Publisher,
+                    publisher_id,
+                    [selectinload(models.Publisher.books)],
+                )
+            )
+        ):
+            await raise_404("publisher")
+        response = await cache.store(
+            etag,
+            schemas.Publisher_Books.from_orm(publisher),
+            [
+                cache_key("publisher", publisher_id),
+                *(embed_tag("book", book.id) for book in publisher.books),
+            ],
+        )
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.post(
@@ -91,6 +256,55 @@ async def create_publisher(
     return new_publisher
 
 
+# create new and update existing publishers
+async def write_publishers(session: AsyncSession, valid: Rows) -> Written:
+    inserts = [
+        (index, publisher) for index, publisher in valid if not publisher.id
+    ]
+    updates = [(index, publisher) for index, publisher in valid if publisher.id]
+    ids = await insert_rows(
+        session,
+        models.Publisher,
+        [publisher.dict(exclude={"id"}) for _, publisher in inserts],
+    )
+    if updates:
+        await update_rows(
+            session,
+            models.Publisher,
+            [publisher.dict() for _, publisher in updates],
+        )
+        await bump_publishers(
+            session, {publisher.id for _, publisher in updates}
+        )
+    return [
+        *((index, id, True) for (index, _), id in zip(inserts, ids)),
+        *((index, publisher.id, False) for index, publisher in updates),
+    ], changed_keys("publisher", (publisher.id for _, publisher in updates))
+
+
+@router.post(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    openapi_extra=bulk_openapi(schemas.PublisherBulk),
+)
+@query_budget(None)
+async def create_publishers_bulk(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
+):
+    return await bulk_write(
+        request,
+        session,
+        cache,
+        schemas.PublisherBulk,
+        lambda session, valid, result: check_ids(
+            session, models.Publisher, "publisher", valid, result
+        ),
+        write_publishers,
+    )
+
+
 @router.put(
     "/{publisher_id}",
     response_model=schemas.Publisher,
@@ -100,6 +314,7 @@ async def update_publisher(
     publisher_id: int,
     publisher: schemas.PublisherCreate = Depends(),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
         updated_publisher := await session.get(
@@ -111,7 +326,9 @@ async def update_publisher(
         await raise_404("publisher")
     for key, value in publisher:
         setattr(updated_publisher, key, value)
+    await bump_publishers(session, {publisher_id})
     await session.commit()
+    await cache.invalidate(*changed_keys("publisher", [publisher_id]))
     return updated_publisher
 
 
@@ -124,6 +341,7 @@ async def patch_publisher(
     publisher_id: int,
     publisher: schemas.PublisherPatch = Depends(),
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
         patched_publisher := await session.get(
@@ -135,7 +353,9 @@ async def patch_publisher(
         await raise_404("publisher")
     for key, value in publisher.dict(exclude_none=True).items():
         setattr(patched_publisher, key, value)
+    await bump_publishers(session, {publisher_id})
     await session.commit()
+    await cache.invalidate(*changed_keys("publisher", [publisher_id]))
     return patched_publisher
 
 
@@ -147,6 +367,7 @@ async def patch_publisher(
 async def delete_publisher(
     publisher_id: int,
     session: AsyncSession = Depends(get_session),
+    cache: Cache = Depends(get_cache),
 ):
     if not (
         deleted_publisher := await session.get(
@@ -157,8 +378,10 @@ async def delete_publisher(
         )
     ):
         await raise_404("publisher")
+    await bump_publishers(session, {publisher_id})
     await session.delete(deleted_publisher)
     await session.commit()
+    await cache.invalidate(*changed_keys("publisher", [publisher_id]))
     return deleted_publisher
 
 
@@ -171,16 +394,19 @@ async def read_publisher_books(
     publisher_id: int,
     _filter: BookFilter = CustomFilterDepends(BookFilter),
     session: AsyncSession = Depends(get_session),
+    loader: Loader = Depends(get_loader),
 ):
-    if not (await session.get(models.Publisher, publisher_id)):
-        await raise_404("publisher")
-    return await paginate(
+    page = await paginate_offset(
         session,
         _filter.sort(
             _filter.filter(
-                select(models.Book)
-                .where(models.Book.publisher_id == publisher_id)
-                .options(selectinload(models.Book.authors))
+                select(models.Book).where(
+                    models.Book.publisher_id == publisher_id
+                )
             )
         ),
+        transform=loader.transform(models.Book, {"authors": BOOK_AUTHORS}),
+    )
+    return await check_parent(
+        session, page, models.Publisher, publisher_id, "publisher"
     )
@@ -0,0 +1,45 @@
+from typing import Any, Callable
+
+# API routes
+from fastapi.routing import APIRoute, request_response
+from fastapi.utils import (
+    create_cloned_field,
+    create_response_field,
+    is_body_allowed_for_status_code,
+)
+
+# pydantic field
+from pydantic.fields import ModelField
+
+# response fields cloned by response model
+CLONED_FIELDS: dict[Any, ModelField] = {}
+
+
+# route cloning every response model once: fastapi clones it for every
+# route, and again for every route of a router when it is included, which is
+# most of the time spent on importing the app
+class LibraryRoute(APIRoute):
+    def __init__(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        *,
+        response_model: Any = None,
+        **kwargs: Any,
+    ):
+        super().__init__(path, endpoint, **kwargs)
+        if response_model is None:
+            return
+        assert is_body_allowed_for_status_code(
+            self.status_code
+        ), f"Status code {self.status_code} must not have a response body"
+        self.response_model = response_model
+        self.response_field = create_response_field(
+            name=f"Response_{self.unique_id}", type_=response_model
+        )
+        if (cloned := CLONED_FIELDS.get(response_model)) is None:
+            cloned = CLONED_FIELDS[response_model] = create_cloned_field(
+                self.response_field
+            )
+        self.secure_cloned_response_field = cloned
+        self.app = request_response(self.get_route_handler())
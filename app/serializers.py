@@ -0,0 +1,59 @@
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Type
+
+# pydantic model and field shape
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+from pydantic.utils import lenient_issubclass
+
+# app settings
+from .settings import settings
+
+try:
+    # optional dependency
+    import orjson
+except ImportError:
+    orjson = None
+
+if settings.serializer == "orjson" and orjson is None:
+    raise ImportError("orjson serializer requires orjson extra")
+
+
+def is_precompiled() -> bool:
+    return settings.serializer == "orjson"
+
+
+# compile a function reading schema fields from ORM rows (or any object
+# with such attributes) into plain data, no validation is done: rows are
+# trusted to match schema
+@lru_cache
+def compile_serializer(schema: Type[BaseModel]) -> Callable[[Any], dict]:
+    # alias, attribute getter, serializer of nested model and whether the
+    # field holds one nested model rather than a list of them
+    fields = [
+        (
+            field.alias,
+            attrgetter(name),
+            compile_serializer(field.type_)
+            if lenient_issubclass(field.type_, BaseModel)
+            else None,
+            field.shape == SHAPE_SINGLETON,
+        )
+        for name, field in schema.__fields__.items()
+    ]
+
+    def serialize(row: Any) -> dict:
+        data = {}
+        for alias, get, nested, single in fields:
+            value = get(row)
+            if nested is not None and value is not None:
+                value = (
+                    nested(value)
+                    if single
+                    else [nested(item) for item in value]
+                )
+            data[alias] = value
+        return data
+
+    return serialize
@@ -1,5 +1,7 @@
 import os
 
+from typing import Optional
+
 # settings class
 from pydantic import BaseSettings
 
@@ -10,6 +12,18 @@ class Settings(BaseSettings):
     app_port: int = 80
     app_reload: bool = False
 
+    # server settings: worker processes, event loop (auto, asyncio or
+    # uvloop) and http parser (auto, h11 or httptools), auto picks uvloop and
+    # httptools when installed; idle keep-alive connections are closed after
+    # keep alive seconds, requests over concurrency limit get 503
+    app_workers: int = 1
+    app_loop: str = "auto"
+    app_http: str = "auto"
+    app_keep_alive: int = 5
+    app_backlog: int = 2048
+    app_limit_concurrency: Optional[int] = None
+    app_access_log: bool = True
+
     # database settings
     db_drivername: str
     db_user: str
@@ -18,6 +32,92 @@ class Settings(BaseSettings):
     db_server: str
     db_db: str
 
+    # pool settings: recycle is in seconds (-1 never), pre-ping tests
+    # every checked out connection with a round trip, warm opens pool size
+    # connections on startup
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = True
+    db_pool_warm: bool = True
+    db_echo: bool = False
+
+    # read replica settings: servers as host or host:port, sharing
+    # credentials and database with primary; strategy is round-robin or
+    # least-busy; reads of a client stay on primary for sticky seconds after
+    # its write and a failed replica is retried after retry seconds
+    db_replica_servers: list[str] = []
+    db_replica_strategy: str = "round-robin"
+    db_replica_sticky_seconds: float = 5
+    db_replica_retry_seconds: float = 30
+
+    # statement cache settings: direct, pgbouncer or disabled
+    db_statement_mode: str = "disabled"
+    db_statement_cache_size: int = 100
+
+    # request metrics settings
+    metrics_enabled: bool = True
+
+    # query log settings (development and test): every request logs its
+    # statement count and time, requests over their query budget or with
+    # statements slower than slow seconds also log the slowest statements
+    # with plans; strict mode fails statements over the budget instead
+    query_log_enabled: bool = False
+    query_budget: int = 10
+    query_slow_seconds: float = 0.1
+    query_slowest: int = 3
+    query_strict: bool = False
+
+    # count settings: default strategy of page totals (exact, estimated,
+    # cached or none), cached counts are kept for ttl seconds
+    count_strategy: str = "exact"
+    count_cache_size: int = 1024
+    count_cache_ttl: float = 30
+
+    # read model settings: books are read with their authors and publisher
+    # from book summaries in one query, summaries are kept up to date by
+    # triggers (created by migrations on postgresql)
+    book_summaries_enabled: bool = False
+
+    # filter settings
+    filter_cache_size: int = 1024
+
+    # sparse fieldset settings: cached response models
+    fields_cache_size: int = 256
+
+    # response serialization: pydantic, or orjson with precompiled
+    # serializers of list pages (requires orjson extra)
+    serializer: str = "pydantic"
+
+    # bulk settings: rows per transaction
+    bulk_batch_size: int = 1000
+
+    # write queue settings: book creates and patches sent with Prefer:
+    # respond-async are queued in memory and written in batches of up to
+    # batch size rows every interval; queued writes are lost when the process
+    # stops before writing them; job statuses are kept for jobs ttl seconds
+    # in redis with the redis cache backend, otherwise the last jobs are
+    # kept by the process, which requires a single worker
+    write_queue_enabled: bool = False
+    write_queue_size: int = 10000
+    write_queue_batch_size: int = 500
+    write_queue_interval_ms: int = 50
+    write_queue_jobs: int = 100000
+    write_queue_jobs_ttl: int = 3600
+
+    # list settings: related rows shown unless expanded
+    preview_size: int = 3
+
+    # export settings: rows fetched from cursor per chunk
+    export_chunk_size: int = 1000
+
+    # response cache settings: memory, redis, redis-memory or none
+    cache_backend: str = "memory"
+    cache_size: int = 1024
+    cache_ttl: int = 60
+    cache_redis_url: str = "redis://localhost:6379/0"
+
     class Config:
         env_file = "local.env" if os.environ.get("LOCAL_ENV", False) else ".env"
 
@@ -0,0 +1,187 @@
+"""Reproducible synthetic catalog for benchmarks.
+
+Books are spread over publishers and authors with Zipf-like skew, so a few
+publishers and authors own most of the books, as in real catalogs. The
+same seed and sizes always produce the same rows and ids.
+
+SQLite databases are recreated from models. PostgreSQL needs migrations
+applied, its tables are emptied before seeding.
+
+    python -m benchmarks.dataset --books 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from itertools import accumulate
+
+# app settings are read on import, sqlite file by default
+for key, value in {
+    "DB_DRIVERNAME": "sqlite+aiosqlite",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_PORT": "0",
+    "DB_SERVER": "",
+    "DB_DB": "benchmarks.sqlite3",
+}.items():
+    os.environ.setdefault(key, value)
+
+# get sqlalchemy functions
+from sqlalchemy import insert, text
+
+# database
+from app.db.database import DATABASE
+from app.db.models import Author, AuthorBookAssociation, Base, Book, Publisher
+
+SEED = 42
+PUBLISHERS = 50
+AUTHORS = 2_000
+BOOKS = 20_000
+CHUNK = 5_000
+
+# rank exponent of skew, 1 is classic Zipf
+SKEW = 1.1
+
+# share of books with one, two and three authors
+AUTHORS_PER_BOOK = (0.7, 0.2, 0.1)
+
+WORDS = (
+    "war peace night day river stone garden house king queen shadow light "
+    "winter summer road sea island city forest fire water glass iron silver "
+    "golden secret last first lost hidden silent broken wild long short"
+).split()
+FIRST_NAMES = (
+    "Anna Boris Clara David Elena Fyodor Greta Hugo Irina Jonas Kira Leo "
+    "Maria Nikolai Olga Pavel Rosa Sergei Tanya Viktor"
+).split()
+
+
+def zipf_weights(count: int) -> list[float]:
+    return list(accumulate(1 / rank**SKEW for rank in range(1, count + 1)))
+
+
+def title(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize()
+
+
+def catalog(
+    seed: int = SEED,
+    publishers: int = PUBLISHERS,
+    authors: int = AUTHORS,
+    books: int = BOOKS,
+) -> tuple[list[dict], list[dict], list[dict], list[dict]]:
+    rng = random.Random(seed)
+    publisher_rows = [
+        {"name": f"{title(rng)} Press {id}"} for id in range(1, publishers + 1)
+    ]
+    author_rows = [
+        {
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": f"{title(rng).split()[0]}son {id}",
+            "middle_name": rng.choice(FIRST_NAMES)
+            if rng.random() < 0.3
+            else None,
+        }
+        for id in range(1, authors + 1)
+    ]
+    publisher_weights, author_weights = (
+        zipf_weights(publishers),
+        zipf_weights(authors),
+    )
+    # ranks are shuffled so that hot rows are not just the first ids
+    publisher_ids = rng.sample(range(1, publishers + 1), publishers)
+    author_ids = rng.sample(range(1, authors + 1), authors)
+    book_rows, association_rows = [], []
+    for id in range(1, books + 1):
+        book_rows.append(
+            {
+                "title": title(rng),
+                "year": min(max(int(rng.gauss(1990, 25)), 1800), 2024),
+                "pages": int(rng.lognormvariate(5.6, 0.4)),
+                "edition": rng.choices((1, 2, 3), (0.8, 0.15, 0.05))[0],
+                "description": " ".join(rng.choices(WORDS, k=30)),
+                "publisher_id": rng.choices(
+                    publisher_ids, cum_weights=publisher_weights
+                )[0],
+            }
+        )
+        count = rng.choices((1, 2, 3), AUTHORS_PER_BOOK)[0]
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(rng.choices(author_ids, cum_weights=author_weights)[0])
+        association_rows.extend(
+            {"book_id": id, "author_id": author_id} for author_id in chosen
+        )
+    return publisher_rows, author_rows, book_rows, association_rows
+
+
+async def reset():
+    async with DATABASE.engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+        else:
+            await connection.execute(
+                text(
+                    "TRUNCATE author_book_association, books, authors, "
+                    "publishers RESTART IDENTITY CASCADE"
+                )
+            )
+
+
+# recreate catalog, ids are assigned in row order starting from 1
+async def seed(**sizes: int) -> dict:
+    DATABASE.connect()
+    await reset()
+    rows = catalog(**sizes)
+    async with DATABASE.engine.begin() as connection:
+        for model, table_rows in zip(
+            (Publisher, Author, Book, AuthorBookAssociation), rows
+        ):
+            for offset in range(0, len(table_rows), CHUNK):
+                await connection.execute(
+                    insert(model), table_rows[offset : offset + CHUNK]
+                )
+        # planner statistics of fresh rows
+        if connection.dialect.name == "postgresql":
+            await connection.execute(text("ANALYZE"))
+    return {
+        "publishers": len(rows[0]),
+        "authors": len(rows[1]),
+        "books": len(rows[2]),
+        "book_authors": len(rows[3]),
+    }
+
+
+def arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--publishers", type=int, default=PUBLISHERS)
+    parser.add_argument("--authors", type=int, default=AUTHORS)
+    parser.add_argument("--books", type=int, default=BOOKS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arguments(parser)
+    args = parser.parse_args()
+
+    async def run() -> dict:
+        try:
+            return await seed(
+                seed=args.seed,
+                publishers=args.publishers,
+                authors=args.authors,
+                books=args.books,
+            )
+        finally:
+            await DATABASE.dispose()
+
+    started = time.perf_counter()
+    counts = asyncio.run(run())
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Index proposals derived from foreign keys and list filters, checked with
+EXPLAIN.
+
+Proposes a (foreign key, primary key) index for every foreign key and a
+(key, id) index for every common ordering of list filters, as keyset pages
+order by their keys with id as tiebreaker. Proposals are compared with the
+indexes of models, and their list queries (with range filters of the
+ordering key) are explained on the database: a proposal fails when its
+query does not use the index or sorts rows. Indexes that are prefixes of
+other indexes are reported as redundant.
+
+PostgreSQL is asked to avoid other plans where it can, so checks show
+whether an index can serve a query whatever the sizes of tables. The same
+checks run in tests/test_indexes.py; run against a database with migrations
+applied (or tables created from models):
+
+    python -m benchmarks.indexes
+"""
+import asyncio
+import os
+import sys
+
+# app settings are read on import, sqlite file by default
+for key, value in {
+    "DB_DRIVERNAME": "sqlite+aiosqlite",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_PORT": "0",
+    "DB_SERVER": "",
+    "DB_DB": "benchmarks.sqlite3",
+}.items():
+    os.environ.setdefault(key, value)
+
+# database
+from app.db.database import DATABASE
+
+# index proposals and their checks
+from app.db.indexes import (
+    check_plan,
+    covering_index,
+    explain,
+    proposals,
+    redundant_indexes,
+)
+
+
+async def main() -> int:
+    DATABASE.connect()
+    failed = 0
+    try:
+        for proposal in proposals():
+            index = covering_index(proposal)
+            plan = await explain(proposal.query)
+            failure = check_plan(plan, index)
+            failed += failure is not None
+            print(
+                f"{proposal.table}({', '.join(proposal.columns)}): "
+                f"{proposal.reason}, index {index or '-'}, "
+                f"{failure or 'ok'}"
+            )
+            if failure:
+                print("    " + plan.replace("\n", "\n    "))
+        for name, other in redundant_indexes():
+            print(f"redundant: {name}, prefix of {other}")
+    finally:
+        await DATABASE.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
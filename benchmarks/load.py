@@ -0,0 +1,294 @@
+"""Throughput and latency of scripted scenarios against the app in-process.
+
+Seeds the synthetic catalog of `benchmarks.dataset`, then sends every
+scenario's requests straight to the ASGI app from concurrent clients, with
+no server or network in between. Prints a JSON report with throughput and
+p50/p95/p99 latency per scenario, so runs of two commits can be compared.
+
+    python -m benchmarks.load --books 20000 --output before.json
+    python -m benchmarks.load --scenario get_book --scenario author_books
+
+SQLite is used unless DB_* settings point to PostgreSQL (with migrations
+applied). Writes change the catalog, so every run seeds it again unless
+--no-seed is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+# app settings are read on import, sqlite file by default
+for key, value in {
+    "DB_DRIVERNAME": "sqlite+aiosqlite",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_PORT": "0",
+    "DB_SERVER": "",
+    "DB_DB": "benchmarks.sqlite3",
+}.items():
+    os.environ.setdefault(key, value)
+
+# app
+from app.main import app
+from app.settings import settings
+
+# synthetic catalog
+from benchmarks import dataset
+
+REQUESTS = 500
+CONCURRENCY = 8
+SIZE = 50
+
+# request of a scenario: method, path and query parameters, the app takes
+# write fields as query parameters too
+Request = tuple[str, str, dict]
+
+
+class Catalog:
+    def __init__(self, sizes: dict, rng: random.Random):
+        self.sizes, self.rng = sizes, rng
+        self.cursors: list[str] = []
+        self.ranks: dict[str, tuple[list[int], list[float]]] = {}
+
+    # ids of rows read or written are skewed too, hot rows are asked most
+    def id(self, table: str) -> int:
+        if table not in self.ranks:
+            count = self.sizes[table]
+            self.ranks[table] = (
+                self.rng.sample(range(1, count + 1), count),
+                dataset.zipf_weights(count),
+            )
+        ids, weights = self.ranks[table]
+        return self.rng.choices(ids, cum_weights=weights)[0]
+
+    def page(self, table: str) -> int:
+        return self.sizes[table] // SIZE
+
+
+async def call(method: str, path: str, params: dict) -> tuple[int, bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params, doseq=True).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    status, body = 500, []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(body)
+
+
+def list_filtered(catalog: Catalog) -> Request:
+    return (
+        "GET",
+        "/books/",
+        {
+            "year__gte": catalog.rng.randint(1900, 2020),
+            "order_by": catalog.rng.choice(("-year", "title", "-pages")),
+            "size": SIZE,
+        },
+    )
+
+
+def deep_offset(catalog: Catalog) -> Request:
+    page = catalog.page("books")
+    return (
+        "GET",
+        "/books/",
+        {"page": catalog.rng.randint(page * 9 // 10, page), "size": SIZE},
+    )
+
+
+def deep_cursor(catalog: Catalog) -> Request:
+    params = {"size": SIZE}
+    if catalog.cursors:
+        params["cursor"] = catalog.rng.choice(catalog.cursors)
+    return "GET", "/books/cursor", params
+
+
+def get_book(catalog: Catalog) -> Request:
+    return "GET", f"/books/{catalog.id('books')}", {}
+
+
+def get_author(catalog: Catalog) -> Request:
+    return "GET", f"/authors/{catalog.id('authors')}", {}
+
+
+def author_books(catalog: Catalog) -> Request:
+    return "GET", f"/authors/{catalog.id('authors')}/books", {"size": SIZE}
+
+
+def create_book(catalog: Catalog) -> Request:
+    return (
+        "POST",
+        "/books/",
+        {
+            "title": dataset.title(catalog.rng),
+            "year": catalog.rng.randint(1900, 2024),
+            "publisher_id": catalog.id("publishers"),
+            "author_ids": list(
+                {
+                    catalog.id("authors")
+                    for _ in range(catalog.rng.randint(1, 3))
+                }
+            ),
+        },
+    )
+
+
+def patch_book(catalog: Catalog) -> Request:
+    return (
+        "PATCH",
+        f"/books/{catalog.id('books')}",
+        {"title": dataset.title(catalog.rng)},
+    )
+
+
+SCENARIOS: dict[str, Callable[[Catalog], Request]] = {
+    "list_filtered": list_filtered,
+    "deep_offset": deep_offset,
+    "deep_cursor": deep_cursor,
+    "get_book": get_book,
+    "get_author": get_author,
+    "author_books": author_books,
+    "create_book": create_book,
+    "patch_book": patch_book,
+}
+
+
+# cursors of the last tenth of books, found by walking all pages once
+async def walk_cursors(catalog: Catalog):
+    params, cursors = {"size": SIZE}, []
+    while True:
+        status, body = await call("GET", "/books/cursor", params)
+        if status != 200 or not (cursor := json.loads(body)["next_cursor"]):
+            break
+        cursors.append(cursor)
+        params["cursor"] = cursor
+    catalog.cursors = cursors[len(cursors) * 9 // 10 :]
+
+
+def percentile(latencies: list[float], n: int) -> Optional[float]:
+    if len(latencies) < 2:
+        return latencies[0] * 1e3 if latencies else None
+    return statistics.quantiles(latencies, n=100)[n - 1] * 1e3
+
+
+async def run_scenario(
+    name: str, catalog: Catalog, requests: int, concurrency: int
+) -> dict:
+    scenario, latencies, errors = SCENARIOS[name], [], 0
+    pending = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for _ in pending:
+            method, path, params = scenario(catalog)
+            started = time.perf_counter()
+            status, _ = await call(method, path, params)
+            latencies.append(time.perf_counter() - started)
+            errors += status >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput": round(requests / seconds, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    sizes = {
+        "publishers": args.publishers,
+        "authors": args.authors,
+        "books": args.books,
+    }
+    if not args.no_seed:
+        await dataset.seed(seed=args.seed, **sizes)
+    await app.router.startup()
+    try:
+        catalog = Catalog(sizes, random.Random(args.seed))
+        scenarios = args.scenario or list(SCENARIOS)
+        if "deep_cursor" in scenarios:
+            await walk_cursors(catalog)
+        results = {
+            name: await run_scenario(
+                name, catalog, args.requests, args.concurrency
+            )
+            for name in scenarios
+        }
+    finally:
+        await app.router.shutdown()
+    return {
+        "commit": commit(),
+        "database": settings.db_drivername,
+        "serializer": settings.serializer,
+        "seed": args.seed,
+        "dataset": sizes,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    dataset.arguments(parser)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--output", help="write report to file")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(benchmark(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Cold start of a worker: import time of `app.main`, an `-X importtime`
+breakdown by package and time from launching `main.py` to its first
+response.
+
+Every measurement runs in a fresh interpreter. The first response is
+`GET /metrics`, which does not touch the database, so pool warming is off
+unless DB_POOL_WARM is set.
+
+    python -m benchmarks.startup
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from collections import Counter
+from urllib.error import URLError
+from urllib.request import urlopen
+
+# app settings are read on import
+for key, value in {
+    "DB_DRIVERNAME": "postgresql+asyncpg",
+    "DB_USER": "library",
+    "DB_PASSWORD": "library",
+    "DB_PORT": "5432",
+    "DB_SERVER": "localhost",
+    "DB_DB": "library",
+    "DB_POOL_WARM": "false",
+}.items():
+    os.environ.setdefault(key, value)
+
+NUMBER = 5
+TOP = 12
+TIMEOUT = 30
+
+IMPORT = (
+    "import time; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_seconds() -> float:
+    return float(
+        subprocess.run(
+            [sys.executable, "-c", IMPORT],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    )
+
+
+# self time of modules summed by top-level package
+def import_breakdown() -> Counter:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    packages = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:") :].split("|")
+        package = name.strip().split(".")[0]
+        if package == "app":
+            package = ".".join(name.strip().split(".")[:2])
+        packages[package] += int(own) / 1e6
+    return packages
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response_seconds() -> float:
+    port = free_port()
+    env = os.environ | {
+        "APP_HOST": "127.0.0.1",
+        "APP_PORT": str(port),
+        "APP_WORKERS": "1",
+        "APP_RELOAD": "false",
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "main.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < TIMEOUT:
+            try:
+                with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError("server did not respond")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    for name, measure in {
+        "import app.main": import_seconds,
+        "first response": first_response_seconds,
+    }.items():
+        seconds = [measure() for _ in range(NUMBER)]
+        print(
+            f"{name:>16}: {min(seconds) * 1e3:8.1f} ms min, "
+            f"{statistics.median(seconds) * 1e3:8.1f} ms median"
+        )
+    print(f"\nimport time by package (self, top {TOP}):")
+    for package, seconds in import_breakdown().most_common(TOP):
+        print(f"{package:>24}: {seconds * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-request database time of the /books/ queries under each statement
+caching mode of `app.db.database.connect_args`.
+
+With caching disabled every request parses and plans its statements again;
+with named prepared statements (direct, pgbouncer) they are prepared once
+per connection and only executed afterwards. Needs a reachable PostgreSQL
+configured by the usual DB_* settings with migrations applied.
+
+    python -m benchmarks.statement_cache
+"""
+import asyncio
+import time
+
+# get sqlalchemy functions
+from sqlalchemy import func, select
+
+# get sqlalchemy async engine and session
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# database
+from app.db.database import DATABASE_URL, connect_args
+from app.db.models import Book
+
+# /books/ statement template
+from app.routers.books import SELECT_BOOKS
+
+MODES = ("disabled", "pgbouncer", "direct")
+REQUESTS = 500
+SIZE = 50
+
+
+# page and count queries of /books/?year__gte=1900&page=n
+async def request(session: AsyncSession, page: int):
+    query = SELECT_BOOKS.where(Book.year >= 1900).order_by(Book.id)
+    await session.scalar(select(func.count()).select_from(query.subquery()))
+    await session.scalars(query.limit(SIZE).offset(page * SIZE))
+
+
+async def measure(mode: str) -> float:
+    engine = create_async_engine(DATABASE_URL, connect_args=connect_args(mode))
+    async with AsyncSession(engine) as session:
+        # warm up, statements are prepared here when cached
+        await request(session, 0)
+        started = time.perf_counter()
+        for page in range(REQUESTS):
+            await request(session, page % 10)
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed / REQUESTS
+
+
+def main():
+    for mode in MODES:
+        seconds = asyncio.run(measure(mode))
+        print(f"{mode:>9}: {seconds * 1e3:8.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
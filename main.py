@@ -5,10 +5,19 @@
 from app.settings import settings
 
 if __name__ == "__main__":
-    # run server
+    # run server, every worker imports app and creates its own engine on
+    # startup; SIGTERM stops accepting connections and waits for running
+    # requests and queued writes before workers exit
     uvicorn.run(
         "app.main:app",
         host=settings.app_host,
         port=settings.app_port,
         reload=settings.app_reload,
+        workers=settings.app_workers,
+        loop=settings.app_loop,
+        http=settings.app_http,
+        timeout_keep_alive=settings.app_keep_alive,
+        backlog=settings.app_backlog,
+        limit_concurrency=settings.app_limit_concurrency,
+        access_log=settings.app_access_log,
     )
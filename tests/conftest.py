@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from typing import Any, NamedTuple, Optional
+from urllib.parse import urlencode
+
+import pytest
+
+# app settings are read on import: sqlite file, budgets fail requests
+for key, value in {
+    "DB_DRIVERNAME": "sqlite+aiosqlite",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_PORT": "0",
+    "DB_SERVER": "",
+    "DB_DB": os.path.join(tempfile.mkdtemp(), "library.sqlite3"),
+    "QUERY_LOG_ENABLED": "true",
+    "QUERY_STRICT": "true",
+}.items():
+    os.environ[key] = value
+
+# sqlalchemy events
+from sqlalchemy import event
+
+# app, database and models
+from app.db.database import DATABASE
+from app.db.models import Base
+from app.main import app
+
+
+class Response(NamedTuple):
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+# send request straight to the app, write fields are query parameters
+async def call(
+    method: str,
+    path: str,
+    params: Optional[dict] = None,
+    body: bytes = b"",
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params or {}, doseq=True).encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            *(
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("test", 80),
+    }
+    status, response_headers, chunks = 500, {}, []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: dict):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update(
+                (name.decode(), value.decode())
+                for name, value in message["headers"]
+            )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return Response(status, response_headers, b"".join(chunks))
+
+
+# run coroutines on the loop of the app, tables are created once
+@pytest.fixture(scope="session")
+def run():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(app.router.startup())
+
+    async def create():
+        async with DATABASE.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    loop.run_until_complete(create())
+    yield loop.run_until_complete
+    loop.run_until_complete(app.router.shutdown())
+    loop.close()
+
+
+# send request and wait for its response
+@pytest.fixture(scope="session")
+def send(run):
+    def send(*args, **kwargs) -> Response:
+        return run(call(*args, **kwargs))
+
+    return send
+
+
+# create row through the app, its id is returned
+@pytest.fixture(scope="session")
+def create(send):
+    def create(path: str, params: dict) -> int:
+        response = send("POST", path, params)
+        assert response.status == 200, response.body
+        return response.json()["id"]
+
+    return create
+
+
+# statements executed by successful request, with its response
+@pytest.fixture(scope="session")
+def statements(send):
+    def statements(
+        method: str, path: str, params: Optional[dict] = None
+    ) -> tuple[int, Response]:
+        executed = []
+
+        def count(*_):
+            executed.append(None)
+
+        engine = DATABASE.engine.sync_engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = send(method, path, params)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        assert response.status == 200, response.body
+        return len(executed), response
+
+    return statements
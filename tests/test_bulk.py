@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+# sqlalchemy errors
+from sqlalchemy.exc import OperationalError
+
+# book routes
+from app.routers import books
+
+# app settings
+from app.settings import settings
+
+
+@pytest.fixture(scope="module")
+def bulk(send):
+    def bulk(path: str, rows: list, ndjson: bool = False) -> dict:
+        if ndjson:
+            body = "\n".join(json.dumps(row) for row in rows).encode()
+            headers = {"content-type": "application/x-ndjson"}
+        else:
+            body, headers = json.dumps(rows).encode(), {}
+        response = send("POST", path, body=body, headers=headers)
+        assert response.status == 200, response.body
+        return response.json()
+
+    return bulk
+
+
+@pytest.fixture(scope="module")
+def relations(create):
+    return (
+        create("/publishers/", {"name": "Bulk"}),
+        create("/authors/", {"first_name": "B", "last_name": "Bulk"}),
+    )
+
+
+def book(publisher_id: int, author_ids: list[int], **fields) -> dict:
+    return {
+        "title": "B",
+        "year": 2000,
+        "publisher_id": publisher_id,
+        "author_ids": author_ids,
+        **fields,
+    }
+
+
+# errors by index of row in body, with their types
+def errors(result: dict) -> dict[int, list[str]]:
+    return {
+        error["index"]: [detail["type"] for detail in error["detail"]]
+        for error in result["errors"]
+    }
+
+
+@pytest.mark.parametrize("ndjson", [False, True], ids=["json", "ndjson"])
+def test_invalid_rows(bulk, ndjson):
+    result = bulk(
+        "/authors/bulk",
+        [
+            {"first_name": "A", "last_name": "B"},
+            {"first_name": "A"},
+            {"first_name": "C", "last_name": "D"},
+        ],
+        ndjson,
+    )
+    assert (result["created"], result["failed"]) == (2, 1)
+    assert result["ids"][1] is None and None not in result["ids"][::2]
+    assert errors(result) == {1: ["value_error.missing"]}
+
+
+def test_duplicate_and_missing_ids(send, bulk, relations):
+    publisher, author = relations
+    [created] = bulk("/books/bulk", [book(publisher, [author])])["ids"]
+    result = bulk(
+        "/books/bulk",
+        [
+            book(publisher, [author], id=created, title="U"),
+            book(publisher, [author], id=created, title="V"),
+            book(publisher, [author], id=10**9),
+            book(10**9, [author, 10**9]),
+        ],
+    )
+    assert (result["updated"], result["failed"]) == (1, 3)
+    assert result["ids"] == [created, None, None, None]
+    assert errors(result) == {
+        1: ["value_error.duplicate"],
+        2: ["not_found.book"],
+        3: ["not_found.publisher", "not_found.author"],
+    }
+    assert send("GET", f"/books/{created}").json()["title"] == "U"
+
+
+def test_body_not_array(send):
+    response = send("POST", "/books/bulk", body=b"{}")
+    assert response.status == 422
+    assert response.json()["detail"][0]["type"] == "value_error.bulk"
+
+
+# a failed statement fails the rows of its batch only
+def test_failed_batch(bulk, relations, monkeypatch):
+    publisher, author = relations
+    write = books.write_books
+
+    async def write_books(session, valid):
+        if any(book.title == "fail" for _, book in valid):
+            raise OperationalError("INSERT", {}, Exception("failed"))
+        return await write(session, valid)
+
+    monkeypatch.setattr(books, "write_books", write_books)
+    monkeypatch.setattr(settings, "bulk_batch_size", 2)
+    result = bulk(
+        "/books/bulk",
+        [
+            book(publisher, [author]),
+            book(publisher, [author]),
+            book(publisher, [author], title="fail"),
+            book(publisher, [author]),
+            book(publisher, [author]),
+        ],
+        ndjson=True,
+    )
+    assert (result["created"], result["failed"]) == (3, 2)
+    assert errors(result) == {
+        2: ["bulk.batch_failed"],
+        3: ["bulk.batch_failed"],
+    }
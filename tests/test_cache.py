@@ -0,0 +1,62 @@
+import pytest
+
+# response cache
+from app.cache import MemoryRedis, RedisCache
+
+# cache dependency
+from app.dependencies import get_cache
+
+# app
+from app.main import app
+
+
+@pytest.fixture
+def cache():
+    cache = RedisCache(MemoryRedis(), 60)
+    app.dependency_overrides[get_cache] = lambda: cache
+    yield cache
+    del app.dependency_overrides[get_cache]
+
+
+# invalidating a tag evicts entries tagged by it, and only them
+def test_memory_redis_tags(run):
+    cache = RedisCache(MemoryRedis(), 60)
+
+    async def check():
+        await cache.set("a", b"a", ["t1"])
+        await cache.set("b", b"b", ["t1", "t2"])
+        await cache.set("c", b"c", ["t2"])
+        await cache.invalidate("t1")
+        assert [await cache.get(key) for key in "abc"] == [None, None, b"c"]
+        await cache.invalidate("c")
+        assert await cache.get("c") is None
+        assert cache.client.data.keys() == {"library:tag:t2"}
+
+    run(check())
+
+
+# renamed publisher is evicted from cached books embedding it
+def test_publisher_rename_evicts_books(run, send, create, cache):
+    publishers = [create("/publishers/", {"name": n}) for n in ("C0", "C1")]
+    author = create("/authors/", {"first_name": "C", "last_name": "Cache"})
+    etags = []
+    for publisher in publishers:
+        book = create(
+            "/books/",
+            {
+                "title": "C",
+                "year": 2000,
+                "publisher_id": publisher,
+                "author_ids": [author],
+            },
+        )
+        etags.append((book, send("GET", f"/books/{book}").headers["etag"]))
+    assert all(run(cache.get(etag)) for _, etag in etags)
+
+    response = send("PATCH", f"/publishers/{publishers[0]}", {"name": "C2"})
+    assert response.status == 200
+    (renamed, evicted), (_, kept) = etags
+    assert run(cache.get(evicted)) is None
+    assert run(cache.get(kept)) is not None
+    response = send("GET", f"/books/{renamed}")
+    assert response.json()["publisher"]["name"] == "C2"
@@ -0,0 +1,27 @@
+import pytest
+
+# index proposals and their checks
+from app.db.indexes import (
+    check_plan,
+    covering_index,
+    explain,
+    proposals,
+    redundant_indexes,
+)
+
+
+# queries of foreign keys and keyset orderings are served by an index
+# without sorting rows
+@pytest.mark.parametrize(
+    "proposal",
+    proposals(),
+    ids=lambda proposal: f"{proposal.table}({','.join(proposal.columns)})",
+)
+def test_proposal_plan(run, proposal):
+    index = covering_index(proposal)
+    plan = run(explain(proposal.query))
+    assert check_plan(plan, index) is None, (index, plan)
+
+
+def test_no_redundant_indexes():
+    assert redundant_indexes() == []
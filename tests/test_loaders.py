@@ -0,0 +1,56 @@
+# publishers with books written by shared authors, "Nested" names them
+def library(create, books: int):
+    authors = [
+        create("/authors/", {"first_name": "N", "last_name": f"A{i}"})
+        for i in range(3)
+    ]
+    publishers = []
+    for i in range(2):
+        publishers.append(
+            publisher := create("/publishers/", {"name": f"Nested {i}"})
+        )
+        for j in range(books):
+            create(
+                "/books/",
+                {
+                    "title": f"N{i}.{j}",
+                    "year": 2000,
+                    "publisher_id": publisher,
+                    "author_ids": authors[: j % 3 + 1],
+                },
+            )
+    return publishers, authors
+
+
+# every level costs a link and a row query, however many rows it holds
+def test_nested_statements(create, statements):
+    for books in (1, 4):
+        publishers, _ = library(create, books)
+        executed, response = statements(
+            "GET", f"/publishers/{publishers[0]}/books"
+        )
+        assert executed == 1 + 1 + 2
+        assert [len(book["authors"]) for book in response.json()["items"]] == [
+            j % 3 + 1 for j in range(books)
+        ]
+        executed, response = statements(
+            "GET",
+            "/publishers/nested",
+            {"name__ilike": "Nested", "order_by": "id"},
+        )
+        assert executed == 1 + 1 + 2 + 2
+        items = response.json()["items"]
+        assert [len(item["books"]) for item in items[-2:]] == [books, books]
+        assert [len(book["authors"]) for book in items[-1]["books"]] == [
+            j % 3 + 1 for j in range(books)
+        ]
+        executed, response = statements(
+            "GET",
+            "/authors/nested",
+            {"first_name__ilike": "N", "order_by": "id"},
+        )
+        assert executed == 1 + 1 + 2 + 1
+        assert all(
+            book["publisher"]["id"] in publishers
+            for book in response.json()["items"][-1]["books"]
+        )
@@ -0,0 +1,67 @@
+import pytest
+
+# budget errors
+from app.queries import QueryBudgetExceeded
+
+# route with declared budget
+from app.routers.publishers import read_publishers_nested
+
+
+# publishers and authors the book is written with
+@pytest.fixture(scope="module")
+def relations(create):
+    return (
+        [create("/publishers/", {"name": name}) for name in ("P0", "P1")],
+        [
+            create("/authors/", {"first_name": "A", "last_name": name})
+            for name in ("A0", "A1", "A2")
+        ],
+    )
+
+
+# writes of one book, in order: authors and publisher change on update
+def writes(publishers: list[int], authors: list[int]) -> list:
+    p0, p1 = publishers
+    a0, a1, a2 = authors
+    return [
+        (
+            "POST",
+            "/books/",
+            {
+                "title": "T",
+                "year": 2000,
+                "publisher_id": p0,
+                "author_ids": [a0, a1],
+            },
+            5,
+        ),
+        (
+            "PUT",
+            "/books/{}",
+            {
+                "title": "U",
+                "year": 2001,
+                "publisher_id": p1,
+                "author_ids": [a1, a2],
+            },
+            7,
+        ),
+        ("PATCH", "/books/{}", {"author_ids": [a0], "publisher_id": p0}, 7),
+        ("PATCH", "/books/{}", {"title": "V"}, 4),
+        ("DELETE", "/books/{}", {}, 5),
+    ]
+
+
+def test_book_write_statements(statements, relations):
+    book_id = None
+    for method, path, params, expected in writes(*relations):
+        executed, response = statements(method, path.format(book_id), params)
+        assert executed == expected, (method, params)
+        book_id = book_id or response.json()["id"]
+
+
+# strict budgets fail the request at the statement over budget
+def test_strict_budget_exceeded(send, monkeypatch):
+    monkeypatch.setattr(read_publishers_nested, "query_budget", 1)
+    with pytest.raises(QueryBudgetExceeded, match=r"2 queries \(budget 1\)"):
+        send("GET", "/publishers/nested")